@@ -0,0 +1,168 @@
+#
+# This is the allocation monitor of the simulator's main loop (it's opt-in, see --allocations in simulator.py).
+#
+# It follows the frame profiler's phases (see profiler.py) and for each phase it keeps:
+#   - how many bytes the phase leaves allocated (the net change of the memory tracemalloc traces), per frame,
+#   - the most it allocated at once while it ran (tracemalloc's peak, reset at every phase), which shows the garbage
+#     a phase makes and throws away again even when it leaves nothing behind,
+#   - the garbage collections that ran during it (gc.callbacks tells when each one starts and stops) and how long they took.
+# Every few frames it also takes a tracemalloc snapshot and compares it with the one before, which gives the lines of code
+# whose allocations grew the most in between (over every phase, so these sites are listed under ALL_PHASES). The frame after
+# each of those snapshots is then followed phase by phase: a snapshot is taken at every lap and compared with the one at the
+# lap before, so the sites that grew during that frame are listed under the phase they grew in.
+#
+# A hot path that doesn't allocate shows 0 net bytes and a small peak, no collections and no allocation sites of its own.
+# Tracing every allocation makes the simulator a few times slower, so the monitor is only for finding allocations (not timing).
+#
+# Usage:
+#
+#     simulator.py --lockstep --frames 3000 --allocations allocations.json     # or allocations.csv
+#
+
+##########################
+
+import csv
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+
+BETWEEN_FRAMES = "between frames"   # the phase of anything that happens outside a frame (like the work after a frame is shown)
+ALL_PHASES = "all phases"           # the phase of the sites found by comparing the snapshots taken every snapshot_every frames
+
+
+class AllocationMonitor:
+    # a snapshot is compared with the one before every snapshot_every frames and the top_sites lines that grew most are kept
+    # (and the top_sites lines that grew most in each phase of the frame after it)
+    def __init__(self, phases, snapshot_every=600, top_sites=10):
+        self.phases = list(phases) + [BETWEEN_FRAMES]
+        self.snapshot_every = snapshot_every
+        self.top_sites = top_sites
+        self.frames = 0
+        self.net_bytes = dict((phase, 0) for phase in self.phases)         # the bytes each phase left allocated over every frame
+        self.peak_bytes = dict((phase, 0) for phase in self.phases)        # the most each phase allocated at once
+        self.gc_pauses = []                 # (frame, phase, generation, milliseconds, objects collected) of every collection
+        self.pending = []                   # the collections whose phase isn't known yet (it's the phase of the next lap)
+        self.gc_started = None
+        self.sites = []                     # (frame, phase, file:line, bytes grown, blocks grown, bytes, blocks) from every comparison
+        self.snapshot = None
+        self.phase_snapshot = None          # the snapshot at the last lap while a frame is followed phase by phase (None otherwise)
+        self.last_memory = 0
+
+    def start(self):
+        tracemalloc.start()
+        gc.callbacks.append(self.gc_callback)
+        self.snapshot = self.take_snapshot()
+        self.last_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def stop(self):
+        if self.gc_callback in gc.callbacks:
+            gc.callbacks.remove(self.gc_callback)
+        tracemalloc.stop()
+
+    # the frame profiler calls these (see FrameProfiler.listener)
+
+    def start_frame(self):
+        self.lap(BETWEEN_FRAMES)
+
+    # this counts what was allocated (and collected) since the last lap towards phase
+    def lap(self, phase):
+        (current, peak) = tracemalloc.get_traced_memory()
+        self.net_bytes[phase] = self.net_bytes[phase] + current - self.last_memory
+        self.peak_bytes[phase] = max(self.peak_bytes[phase], peak - self.last_memory)
+        for (generation, milliseconds, collected) in self.pending:
+            self.gc_pauses.append((self.frames, phase, generation, milliseconds, collected))
+        self.pending = []
+        if self.phase_snapshot is not None:
+            snapshot = self.take_snapshot()
+            self.keep_sites(phase, snapshot.compare_to(self.phase_snapshot, "lineno"))
+            self.phase_snapshot = snapshot
+        tracemalloc.reset_peak()
+        self.last_memory = tracemalloc.get_traced_memory()[0]
+
+    def end_frame(self):
+        self.frames = self.frames + 1
+        self.phase_snapshot = None
+        if self.frames % self.snapshot_every == 0:
+            self.compare()
+            self.phase_snapshot = self.snapshot     # the next frame (and the time before it) is followed phase by phase
+        self.last_memory = tracemalloc.get_traced_memory()[0]     # (the snapshot itself doesn't count towards any phase)
+        tracemalloc.reset_peak()
+
+    def gc_callback(self, stage, info):
+        if stage == "start":
+            self.gc_started = time.perf_counter()
+        elif self.gc_started is not None:
+            self.pending.append((info["generation"], (time.perf_counter() - self.gc_started) * 1000, info["collected"]))
+            self.gc_started = None
+
+    ##############################
+    # allocation sites           #
+    ##############################
+
+    # this is a snapshot without the monitor's own allocations (and tracemalloc's)
+    def take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    # this keeps the lines whose allocations grew the most since the last snapshot
+    def compare(self):
+        snapshot = self.take_snapshot()
+        self.keep_sites(ALL_PHASES, snapshot.compare_to(self.snapshot, "lineno"))
+        self.snapshot = snapshot
+
+    # this keeps the top_sites lines of a comparison that grew the most (as the sites of phase)
+    def keep_sites(self, phase, stats):
+        grown = [stat for stat in stats if stat.size_diff > 0]
+        for stat in grown[:self.top_sites]:
+            frame = stat.traceback[0]
+            self.sites.append((self.frames, phase, os.path.basename(frame.filename) + ":" + str(frame.lineno),
+                               stat.size_diff, stat.count_diff, stat.size, stat.count))
+
+    ##############################
+    # reports                    #
+    ##############################
+
+    # this returns the numbers of every phase (per frame where it's a rate) and the allocation sites (each with its phase, or ALL_PHASES)
+    def summary(self):
+        frames = max(self.frames, 1)
+        phases = {}
+        for phase in self.phases:
+            pauses = [pause[3] for pause in self.gc_pauses if pause[1] == phase]
+            phases[phase] = {
+                "net_bytes_per_frame": self.net_bytes[phase] / frames,
+                "peak_bytes": self.peak_bytes[phase],
+                "gc_collections": len(pauses),
+                "gc_ms_total": sum(pauses),
+                "gc_ms_max": max(pauses, default=0),
+            }
+        return {
+            "frames": self.frames,
+            "snapshot_every": self.snapshot_every,
+            "phases": phases,
+            "gc_pauses": [dict(zip(["frame", "phase", "generation", "ms", "collected"], pause)) for pause in self.gc_pauses],
+            "top_sites": [dict(zip(["frame", "phase", "site", "size_diff", "count_diff", "size", "count"], site)) for site in self.sites],
+        }
+
+    # this writes the summary to a JSON file, or to a CSV file (one row per phase and then one per allocation site) if the path ends in .csv
+    def write(self, path):
+        summary = self.summary()
+        if not path.endswith(".csv"):
+            with open(path, "w") as f:
+                json.dump(summary, f, indent=2)
+            return
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["phase", "net_bytes_per_frame", "peak_bytes", "gc_collections", "gc_ms_total", "gc_ms_max"])
+            for phase in self.phases:
+                numbers = summary["phases"][phase]
+                writer.writerow([phase, "%.1f" % numbers["net_bytes_per_frame"], numbers["peak_bytes"], numbers["gc_collections"],
+                                 "%.3f" % numbers["gc_ms_total"], "%.3f" % numbers["gc_ms_max"]])
+            writer.writerow([])
+            writer.writerow(["frame", "phase", "site", "size_diff", "count_diff", "size", "count"])
+            writer.writerows(self.sites)
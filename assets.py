@@ -0,0 +1,67 @@
+#
+# This is the asset manager used by the simulator.
+#
+# Every image is loaded from disk once at startup and converted to the display's pixel format
+# (convert for opaque images, convert_alpha for images with per-pixel alpha) with the colorkey applied and RLE acceleration on.
+# After that, sprites only swap references to these surfaces, so nothing is read from disk while the simulation runs.
+#
+
+##########################
+
+import os
+import time
+
+import pygame
+
+
+# the directory that holds the simulator's images (this is next to this file, so the simulator can be started from anywhere)
+IMAGE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+
+# the name of each image the simulator uses (the file is IMAGE_DIRECTORY/<name>.png)
+IMAGE_NAMES = ["ship_right", "ship_left", "earth", "black hole"]
+
+
+class AssetManager:
+    def __init__(self, colorkey, directory=IMAGE_DIRECTORY):
+        self.colorkey = colorkey        # this color is made transparent on every image
+        self.directory = directory
+        self.images = {}                # image name -> converted surface
+        self.load_times = {}            # image name -> milliseconds it took to load and convert the image
+
+    # this loads and converts every image in the list (the display must already be set up so the images can be converted)
+    def load_all(self, names=IMAGE_NAMES):
+        for name in names:
+            self.load(name)
+
+    def load(self, name):
+        t0 = time.perf_counter()
+        image = pygame.image.load(os.path.join(self.directory, name + ".png"))
+        if image.get_flags() & pygame.SRCALPHA:
+            image = image.convert_alpha()
+        else:
+            image = image.convert()
+        image.set_colorkey(self.colorkey, pygame.RLEACCEL)     # run-length encoding makes the transparent parts almost free to blit
+        self.images[name] = image
+        self.load_times[name] = (time.perf_counter() - t0) * 1000
+        return image
+
+    # this returns the already loaded surface (it never goes to the disk)
+    def image(self, name):
+        return self.images[name]
+
+    # this is the number of bytes the pixels of a loaded image take up
+    def memory(self, name):
+        image = self.images[name]
+        return image.get_pitch() * image.get_height()
+
+    def total_memory(self):
+        return sum(self.memory(name) for name in self.images)
+
+    # this returns a list of strings (one per image) with the load time and the memory of every image
+    def report(self):
+        lines = []
+        for name in self.images:
+            (width, height) = self.images[name].get_size()
+            lines.append("%-12s %5d x %-5d %8.2f ms %10.1f KB" % (name, width, height, self.load_times[name], self.memory(name) / 1024))
+        lines.append("%-12s %13s %8.2f ms %10.1f KB" % ("total", "", sum(self.load_times.values()), self.total_memory() / 1024))
+        return lines
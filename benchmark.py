@@ -0,0 +1,133 @@
+#
+# This is the benchmark suite of the simulator.
+#
+# It runs simulator.py without a window (SDL_VIDEODRIVER=dummy) once for each scripted flight below, with one simulation
+# step per frame and no frame rate limit, and reports the frames per second, the frame time percentiles, the startup time
+# and the peak memory of each one. The results can be saved as JSON and compared against a saved baseline,
+# so a change that slows down the drawing or the calendars shows up as a regression.
+#
+# Usage:
+#
+#     python benchmark.py                                 # run every scenario and print the results
+#     python benchmark.py --output baseline.json          # ...and save them
+#     python benchmark.py --baseline baseline.json        # ...and fail if they got worse than the saved ones
+#
+
+##########################
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+SIMULATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulator.py")
+
+
+# this is a script that holds a key down from the first frame on
+def hold(key):
+    return [[0, "KEYDOWN", key]]
+
+# this is a script that taps a key every `every` frames
+def taps(key, frames, every):
+    events = []
+    for frame in range(0, frames, every):
+        events.append([frame, "KEYDOWN", key])
+        events.append([frame + 1, "KEYUP", key])
+    return events
+
+
+# Each scenario is a script of key presses and the number of frames to run it for.
+# With one step per frame, Earth is off the screen after 202 frames of holding RIGHT, the ship reaches the black hole
+# 1000 frames later, and 2201 frames of holding RIGHT leave it 1 away from the event horizon.
+SCENARIOS = {
+    "idle near Earth": (600, []),
+    "cruise interstellar": (1100, hold("RIGHT")),
+    "approach black hole": (2201, hold("RIGHT")),
+    "toggle perspective": (600, taps("TAB", 600, 2)),
+}
+
+
+# this runs the simulator for one scenario and returns its report (with the startup time as seen from outside the simulator)
+def run_scenario(name, frames, events, extra_args):
+    with tempfile.TemporaryDirectory() as directory:
+        script_path = os.path.join(directory, "script.json")
+        report_path = os.path.join(directory, "report.json")
+        with open(script_path, "w") as f:
+            json.dump({"events": events}, f)
+
+        environment = dict(os.environ)
+        environment["SDL_VIDEODRIVER"] = "dummy"
+        environment["SDL_AUDIODRIVER"] = "dummy"
+        command = [sys.executable, SIMULATOR, "--script", script_path, "--frames", str(frames), "--lockstep", "--fps", "0", "--report", report_path] + extra_args
+
+        launched = time.time()
+        subprocess.run(command, env=environment, check=True, stdout=subprocess.DEVNULL)
+        with open(report_path) as f:
+            report = json.load(f)
+
+    report["scenario"] = name
+    report["process_startup_ms"] = (report["first_frame_time"] - launched) * 1000     # this includes starting Python and the imports
+    return report
+
+
+# this returns a list of strings describing every scenario that got worse than the baseline by more than tolerance (a fraction)
+def regressions(results, baseline, tolerance):
+    problems = []
+    for name in results:
+        if name not in baseline:
+            continue
+        now = results[name]
+        before = baseline[name]
+        if now["fps"] < before["fps"] * (1 - tolerance):
+            problems.append("%s: fps dropped from %.1f to %.1f" % (name, before["fps"], now["fps"]))
+        if now["frame_ms"]["p99"] > before["frame_ms"]["p99"] * (1 + tolerance):
+            problems.append("%s: p99 frame time rose from %.2f ms to %.2f ms" % (name, before["frame_ms"]["p99"], now["frame_ms"]["p99"]))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulator with scripted flights.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="only run this scenario (can be given more than once)")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results against this JSON file (saved with --output) and fail on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="how much worse than the baseline (as a fraction) counts as a regression")
+    parser.add_argument("--dirty-rects", action="store_true", help="run the simulator with dirty rectangle rendering")
+    parser.add_argument("--fleet", type=int, default=0, help="run the simulator with a fleet of this many ships")
+    args = parser.parse_args()
+
+    extra_args = []
+    if args.dirty_rects:
+        extra_args.append("--dirty-rects")
+    if args.fleet > 0:
+        extra_args += ["--fleet", str(args.fleet)]
+
+    results = {}
+    print("%-22s %8s %8s %8s %8s %12s %10s" % ("scenario", "fps", "p50 ms", "p99 ms", "max ms", "startup ms", "peak MB"))
+    for name in args.scenario or list(SCENARIOS):
+        (frames, events) = SCENARIOS[name]
+        report = run_scenario(name, frames, events, extra_args)
+        results[name] = report
+        peak = report["peak_rss_kb"] / 1024 if report["peak_rss_kb"] is not None else float("nan")
+        print("%-22s %8.1f %8.2f %8.2f %8.2f %12.1f %10.1f" % (name, report["fps"], report["frame_ms"]["p50"], report["frame_ms"]["p99"],
+                                                              report["frame_ms"]["max"], report["process_startup_ms"], peak))
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = regressions(results, baseline, args.tolerance)
+        for problem in problems:
+            print("REGRESSION " + problem)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
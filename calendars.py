@@ -0,0 +1,55 @@
+#
+# This makes the calendars the simulator shows (as lists of strings where each string is a row of the calendar).
+#
+# The grid of a month only depends on its year and month, so it's built once with calendar.month() and cached
+# along with the row and column of every day in it. Today's cell is then blanked out by its index instead of
+# searching the rows for it, and whole calendars are cached by (date, name, age) because near the event horizon
+# Earth's calendar can jump hundreds of days at a time and come back to the same months often.
+#
+
+##########################
+
+import calendar
+
+from functools import lru_cache
+
+
+MONTH = [None, "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]  # MONTH[i] provides a string of the month name
+
+
+class MonthGrid:
+    def __init__(self, year, month):
+        self.rows = calendar.month(year, month).split("\n")     # the title, the names of the days and then one row per week
+        if self.rows[-1] == "":                                 # remove the last row if it's blank
+            del self.rows[-1]
+
+        # the (row, column) of every day in the rows (each day takes up two characters and each weekday three)
+        self.cells = {}
+        weeks = calendar.monthcalendar(year, month)
+        for week in range(0, len(weeks)):
+            for weekday in range(0, 7):
+                day = weeks[week][weekday]
+                if day != 0:
+                    self.cells[day] = (week + 2, weekday * 3)
+
+    # this returns the rows of the month with the given day blanked out
+    def without_day(self, day):
+        rows = list(self.rows)
+        (row, column) = self.cells[day]
+        rows[row] = rows[row][:column] + "  " + rows[row][column + 2:]
+        return rows
+
+
+@lru_cache(maxsize=256)
+def month_grid(year, month):
+    return MonthGrid(year, month)
+
+
+# this creates the calendar (a tuple of strings where each string is a row of the calendar)
+@lru_cache(maxsize=128)
+def create_calendar(input_date, name_of_calendar, age):
+    rows = month_grid(input_date.year, input_date.month).without_day(input_date.day)
+    rows.append(" Today is: " + MONTH[input_date.month] + " " + str(input_date.day))   # add today's date to the last row
+    rows.append("      Age: " + str(age))                                               # add the current age of the person to the last row
+    rows.insert(0, name_of_calendar)                                                    # insert the calendar name at the top of the calendar
+    return tuple(rows)
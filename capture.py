@@ -0,0 +1,138 @@
+#
+# This captures the simulator's frames and writes them to numbered image files (to make videos of a flight).
+#
+# capture() only blits the frame onto one of a fixed number of spare surfaces and puts it on a queue, and a pool of encoder
+# threads takes the frames off the queue and writes them as PNG files (frame_000001.png, ...) or as raw RGB files
+# (frame_000001.rgb, width * height * 3 bytes), so the simulation never waits for a file to be written.
+# The spare surfaces are the backpressure: once every one of them is waiting to be written, an export (which runs on a
+# virtual clock, so waiting doesn't change what it shows) waits for the encoders before the next frame, and a live capture
+# (which follows the real time) drops the frame and counts it instead. A frame is numbered by the frame it was,
+# so a dropped frame leaves a gap in the numbers.
+#
+# The PNG files are put together here with zlib (at a low compression level) instead of pygame.image.save(), which is
+# several times slower and holds the GIL the whole time; zlib lets go of it while compressing, so the encoders run side by side.
+#
+# Usage:
+#
+#     simulator.py --script flight.json --export frames           # without a window, one frame per simulation step
+#     simulator.py --replay flight.log --export frames --export-format raw
+#     simulator.py --export frames --export-live                  # the window as it's played (frames may be dropped)
+#     ffmpeg -framerate 60 -pattern_type glob -i "frames/*.png" flight.mp4
+#
+
+##########################
+
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import pygame
+
+
+FORMATS = {"png": "png", "raw": "rgb"}     # format -> file extension
+PNG_COMPRESSION = 3                         # the zlib level of the PNG files (1 is fastest, 9 is smallest)
+
+
+# this returns a PNG chunk (its length, its type, its data and the CRC of the type and the data)
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+# this returns the surface as the bytes of an 8 bit RGB PNG file (every row unfiltered)
+def png_bytes(surface):
+    (width, height) = surface.get_size()
+    pixels = pygame.image.tobytes(surface, "RGB")
+    stride = width * 3
+    rows = b"".join(b"\x00" + pixels[y * stride:(y + 1) * stride] for y in range(0, height))    # each row starts with its filter type (0 is none)
+    return (b"\x89PNG\r\n\x1a\n"
+            + png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))   # 8 bits per channel, RGB, no interlacing
+            + png_chunk(b"IDAT", zlib.compress(rows, PNG_COMPRESSION))
+            + png_chunk(b"IEND", b""))
+
+
+class FrameCapture:
+    # the frames are size (width, height) and every spare surface has the pixel format of like (the screen)
+    # (drop=True drops the frames the encoders can't keep up with instead of waiting for them)
+    def __init__(self, directory, size, like, format="png", workers=None, buffers=32, drop=False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.format = format
+        self.extension = FORMATS[format]
+        self.drop = drop
+        self.spare = queue.Queue()          # the surfaces that are free to capture a frame onto
+        for i in range(0, buffers):
+            self.spare.put(pygame.Surface(size, 0, like))
+        self.frames = queue.Queue()         # (frame number, surface) waiting to be written
+        self.captured = 0
+        self.dropped = 0                    # the frames that came while every spare surface was waiting to be written (with drop)
+        self.waited = 0.0                   # the seconds capture() waited for a spare surface (without drop)
+        self.written = [0] * (workers or os.cpu_count() or 1)     # the frames each encoder has written
+        self.started = None                 # when the first frame was captured
+        self.seconds = None                 # from the first frame captured to the last one written (once close() is done)
+        self.threads = []
+        for i in range(0, len(self.written)):
+            thread = threading.Thread(target=self.run, args=(i,), name="capture " + str(i), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    # this queues a copy of the surface as frame number (it's called from the main loop, and only waits if the encoders are behind and it doesn't drop)
+    def capture(self, number, surface):
+        if self.started is None:
+            self.started = time.perf_counter()
+        try:
+            copy = self.spare.get_nowait()
+        except queue.Empty:
+            if self.drop:
+                self.dropped = self.dropped + 1
+                return
+            waiting = time.perf_counter()
+            copy = self.spare.get()
+            self.waited = self.waited + time.perf_counter() - waiting
+        copy.blit(surface, (0, 0))
+        self.frames.put((number, copy))
+        self.captured = self.captured + 1
+
+    # this waits for every captured frame to be written and stops the encoders
+    def close(self):
+        for thread in self.threads:
+            self.frames.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.started is not None:
+            self.seconds = time.perf_counter() - self.started
+
+    # this returns the numbers of the capture (the throughput is the frames written per second, from the first capture to the last write)
+    def report(self):
+        written = sum(self.written)
+        return {
+            "directory": self.directory,
+            "format": self.format,
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "waited_seconds": self.waited,
+            "written": written,
+            "seconds": self.seconds,
+            "frames_per_second": written / self.seconds if self.seconds else 0,
+        }
+
+    ##############################
+    # the encoder threads        #
+    ##############################
+
+    def run(self, index):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            (number, surface) = item
+            path = os.path.join(self.directory, "frame_%06d.%s" % (number, self.extension))
+            if self.format == "png":
+                data = png_bytes(surface)
+            else:
+                data = pygame.image.tobytes(surface, "RGB")
+            with open(path, "wb") as f:
+                f.write(data)
+            self.spare.put(surface)         # the surface can capture another frame now
+            self.written[index] = self.written[index] + 1
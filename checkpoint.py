@@ -0,0 +1,144 @@
+#
+# This saves the state of a flight to a small checkpoint file and starts the simulator again from it.
+#
+# A checkpoint is one fixed-size binary record (about a hundred bytes): the format version, the seed the stars were made
+# with, the start date, the gravity model, both observers' proper time (see ProperTime in engine.py), the ship's location
+# and facing, where Earth and the black hole are on the screen, the simulation clock and the offsets of the star layers.
+# Everything else (the dates, the ages, the travel mode, the chunks of stars) follows from those, so resuming doesn't have to
+# fly back: the stars are made again from the seed and scrolled straight to their offsets.
+#
+# Packing a checkpoint on the main loop only takes a few microseconds; a background thread writes it to a temporary file
+# and moves that over the checkpoint (os.replace), so the checkpoint on the disk is always a whole one, even after a crash,
+# and saving every few seconds never holds up a frame. Only the newest checkpoint waiting to be written is kept.
+#
+# Usage:
+#
+#     simulator.py --checkpoint flight.ckpt               # saved every few seconds and when the simulator quits
+#     simulator.py --checkpoint flight.ckpt --resume      # carries on where flight.ckpt left off (or starts a new flight)
+#
+
+##########################
+
+import os
+import struct
+import threading
+
+from datetime import date
+
+from engine import MODES
+from dilation import MODEL_NAMES
+
+
+MAGIC = b"TDSC"
+VERSION = 1
+HEADER = struct.Struct("<4sBB")     # magic, version, the number of star layers
+# seed, start date (as an ordinal), start age, model, mode, facing, ship location, Earth's x, the black hole's x and speed,
+# Earth's days and fraction of a day, the ship's days and fraction of a day, jump days, elapsed ms, steps done, clock ms, move credit
+STATE = struct.Struct("<QIHBBBiiibIdIdIdQQd")
+OFFSET = struct.Struct("<q")        # the offset of one star layer
+
+FACINGS = ["RIGHT", "LEFT"]
+
+
+# this returns the checkpoint of the engine's state, the main loop's clock (now, steps done and move credit) and the star layers as bytes
+def pack_checkpoint(engine, seed, now, steps_done, move_credit, star_layers):
+    state = engine.state
+    data = HEADER.pack(MAGIC, VERSION, len(star_layers)) + STATE.pack(
+        seed, state.earth_time.start_date.toordinal(), state.earth_time.start_age, MODEL_NAMES.index(engine.model),
+        state.k, FACINGS.index(state.facing), state.ship_location, state.earth_x, state.black_hole_x, state.black_hole_speed,
+        state.earth_time.days, state.earth_time.fraction, state.ship_time.days, state.ship_time.fraction,
+        state.jump_days, state.elapsed, steps_done, now, move_credit)
+    return data + b"".join(OFFSET.pack(layer.offset) for layer in star_layers)
+
+
+class Checkpoint:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError(path + " isn't a version " + str(VERSION) + " checkpoint")
+        (magic, version, layers) = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or len(data) != HEADER.size + STATE.size + layers * OFFSET.size:
+            raise ValueError(path + " isn't a version " + str(VERSION) + " checkpoint")
+        (self.seed, start_ordinal, self.start_age, model, self.k, facing, self.ship_location, self.earth_x, self.black_hole_x,
+         self.black_hole_speed, self.earth_days, self.earth_fraction, self.ship_days, self.ship_fraction,
+         self.jump_days, self.elapsed, self.steps_done, self.now, self.move_credit) = STATE.unpack_from(data, HEADER.size)
+        self.start_date = date.fromordinal(start_ordinal)
+        self.model = MODEL_NAMES[model]
+        self.facing = FACINGS[facing]
+        self.offsets = [offset for (offset,) in OFFSET.iter_unpack(data[HEADER.size + STATE.size:])]
+
+    # this puts the engine (made with this checkpoint's start date, start age and model) and the star layers (made from its seed) back where they were
+    def restore(self, engine, star_layers):
+        state = engine.state
+        state.k = self.k
+        state.mode = MODES[self.k]
+        state.facing = self.facing
+        state.ship_location = self.ship_location
+        state.earth_x = self.earth_x
+        state.black_hole_x = self.black_hole_x
+        state.black_hole_speed = self.black_hole_speed
+        state.earth_time.days = self.earth_days
+        state.earth_time.fraction = self.earth_fraction
+        state.ship_time.days = self.ship_days
+        state.ship_time.fraction = self.ship_fraction
+        state.jump_days = self.jump_days
+        state.elapsed = self.elapsed
+        state.earth_date = state.earth_time.date()
+        state.ship_date = state.ship_time.date()
+        state.earth_age = state.earth_time.age()
+        state.ship_age = state.ship_time.age()
+        engine.update_travel_mode()
+        for (layer, offset) in zip(star_layers, self.offsets):
+            layer.scroll_to(offset)
+
+
+class CheckpointWriter:
+    def __init__(self, path):
+        self.path = path
+        self.pending = None                 # the newest checkpoint that hasn't been written yet (bytes)
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.running = True
+        self.saved = 0                      # the checkpoints written so far
+        self.thread = threading.Thread(target=self.run, name="checkpoint", daemon=True)
+        self.thread.start()
+
+    # this hands a checkpoint made with pack_checkpoint() to the background thread (it's called from the main loop and never waits)
+    def save(self, data):
+        with self.lock:
+            self.pending = data
+        self.wake.set()
+
+    # this writes the checkpoint that's still waiting (if there is one) and stops the background thread
+    def close(self):
+        self.running = False
+        self.wake.set()
+        self.thread.join()
+
+    ##############################
+    # the background thread      #
+    ##############################
+
+    def run(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            running = self.running          # (read before the checkpoint, so the last one saved before close() is always written)
+            with self.lock:
+                data = self.pending
+                self.pending = None
+            if data is not None:
+                self.write(data)
+            if not running:
+                break
+
+    # this writes the checkpoint next to the old one and then swaps it in (so a crash leaves either the old one or the new one)
+    def write(self, data):
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self.saved = self.saved + 1
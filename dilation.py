@@ -0,0 +1,130 @@
+#
+# This is the time dilation maths of the simulator.
+#
+# SLOWER_DAY, FASTER_DAY and JUMP_DAYS work out the length of a day (and how many days Earth's calendar jumps)
+# from the ship's distance to the event horizon. The ship's location is always a whole number between the black hole
+# and the event horizon, so DilationTables works every answer out once per (bh_location, eh_location, milliseconds_per_day, model)
+# and the simulation just looks them up by distance.
+#
+# The model is one of the gravity models in gravity.py. The "toy" model is the original curve of SLOWER_DAY and FASTER_DAY
+# (its tables are exactly what they return), and the physical models swap in a different curve at no cost per frame.
+# Only the toy model jumps Earth's calendar by the JUMP_DAYS ladder: a physical model's factor already is the whole dilation,
+# so seen from the ship Earth's day is FASTER_DAY long and its calendar moves a day at a time.
+#
+
+##########################
+
+import math
+
+from functools import lru_cache
+
+
+# This is the number of milliseconds in the program that represents one "real" day in the calendar.
+# In the simulation, we could have experienced time going at time's normal rate, but then you'd have to wait an entire day on your calendar
+# to see one day move on the simulation's calendar. As such, we are shortening the simulation's experienced day to be faster than an actual experienced day.
+# Generally, I will set it up to be about one real second = "one day you experience" in the simulation.
+MILLISECONDS_PER_DAY = 1000
+
+
+# The following amounts to gamma in the time contraction formula.
+# This is used when you are on Earth watching a ship go closer to a mass.
+# Your clock will stay the same but their clock will seem to slow down (from your perspective).
+# This essentially provides the amount of slow-down given the ship's distance from the massive object.
+# The closer the ship is to the mass (ie shorter the distance), the higher the returned integer.
+# R is the distance from the ship to the event horizon and D is the distance from the black hole's "mode" to the event horizon
+def SLOWER_DAY(R, D, milliseconds_per_day=MILLISECONDS_PER_DAY):
+    factor = (math.sqrt(1 - ((D - R)/D)**2)) ** 2
+    contract = round(milliseconds_per_day / factor)
+    return contract
+
+
+# The following amounts to gamma in the time dilation formula.
+# This is used when you are on a ship (going towards a mass) watching Earth.
+# Your clock will stay the same but Earth's clock will seem to speed up (from your perspective).
+# This essentially provides the amount of speed-up given the ship's distance from the massive object.
+# The closer the ship is to the mass (ie shorter the distance), the lower the returned integer.
+# R is the distance from the ship to the event horizon and D is the distance from the black hole's "mode" to the event horizon
+def FASTER_DAY(R, D, milliseconds_per_day=MILLISECONDS_PER_DAY):
+    factor = (math.sqrt(1 - ((D - R)/D)**2)) ** 2
+    dilate = round(milliseconds_per_day * factor)
+    return dilate
+
+
+# This is the number of days Earth's calendar jumps every time its (sped up) day goes by, as seen from the ship.
+# radius is the distance from the ship to the event horizon.
+# Once the ship is within 1 of the event horizon, the calendar keeps jumping by whatever it jumped last (previous).
+def JUMP_DAYS(radius, previous):
+    if radius > 500:
+        jump_days = 1
+    elif radius > 250:
+        jump_days = 2
+    elif radius > 125:
+        jump_days = 4
+    elif radius > 62:
+        jump_days = 8
+    elif radius > 30:
+        jump_days = 16
+    elif radius > 15:
+        jump_days = 32
+    elif radius > 8:
+        jump_days = 64
+    elif radius > 4:
+        jump_days = 128
+    elif radius > 2:
+        jump_days = 256
+    elif radius > 1:
+        jump_days = 512
+    else:
+        jump_days = previous
+    return jump_days
+
+
+# the gravity models the tables can be built from (see gravity.py)
+MODEL_NAMES = ["toy", "schwarzschild", "falling"]
+
+
+class DilationTables:
+    def __init__(self, bh_location, eh_location, milliseconds_per_day=MILLISECONDS_PER_DAY, model="toy"):
+        from gravity import MODELS      # (gravity.py uses NumPy, so it's only imported once tables are built and importing the engine stays quick)
+
+        self.key = (bh_location, eh_location, milliseconds_per_day, model)
+        self.distance = eh_location - bh_location       # this is D (the distance from the black hole's "mode" to the event horizon)
+        self.milliseconds_per_day = milliseconds_per_day
+        self.model = MODELS[model]
+
+        # factor[R], slower_day[R] and faster_day[R] for every whole distance R from 1 to D (there's no day length right at the event horizon)
+        # (SLOWER_DAY is a normal day divided by the factor and FASTER_DAY a normal day times it, both rounded the way round() does)
+        factors = self.model.factor(range(1, self.distance + 1), self.distance)
+        self.factor = [None] + factors.tolist()
+        self.slower_day = [None] + [int(day) for day in (milliseconds_per_day / factors).round()]
+        self.faster_day = [None] + [int(day) for day in (milliseconds_per_day * factors).round()]
+
+        # jump_days[radius] for every radius the ladder tells apart (anything farther jumps 1 day, anything within 1 keeps the last jump)
+        # (only the toy model has the ladder, every other model always jumps 1 day)
+        self.jump_days = []
+        if self.model.legacy_jumps:
+            self.jump_days = [JUMP_DAYS(radius, None) for radius in range(0, 501)]
+
+    # this is SLOWER_DAY(R, D) (a distance outside the table is clamped to it)
+    def slower(self, R):
+        return self.slower_day[min(max(R, 1), self.distance)]
+
+    # this is FASTER_DAY(R, D) (a distance outside the table is clamped to it)
+    def faster(self, R):
+        return self.faster_day[min(max(R, 1), self.distance)]
+
+    # this is JUMP_DAYS(radius, previous) for the toy model (and 1 for the others)
+    def jump(self, radius, previous):
+        if not self.model.legacy_jumps:
+            return 1
+        if radius >= len(self.jump_days):
+            return 1
+        if radius <= 1:
+            return previous
+        return self.jump_days[radius]
+
+
+# this returns the tables for a configuration, building them only the first time that configuration is asked for
+@lru_cache(maxsize=32)
+def dilation_tables(bh_location, eh_location, milliseconds_per_day=MILLISECONDS_PER_DAY, model="toy"):
+    return DilationTables(bh_location, eh_location, milliseconds_per_day, model)
@@ -0,0 +1,117 @@
+#
+# This is the dirty rectangle renderer used by the simulator.
+#
+# Every frame the simulator describes what's on the screen as a list of SceneItems (a name, the rectangle it covers,
+# a key that changes whenever it looks different, and a function that draws it). The renderer compares the list with
+# the previous frame's and only redraws and updates the parts of the screen that changed, so when the ship is idle
+# "near Earth" and only a calendar digit changes, only that calendar is drawn and sent to the display.
+#
+
+##########################
+
+import pygame
+
+
+class SceneItem:
+    def __init__(self, name, rect, key, draw, phase="sprite drawing"):
+        self.name = name            # this has to be unique within a frame
+        self.rect = pygame.Rect(rect)
+        self.key = key              # anything that compares equal when the item looks the same
+        self.draw = draw            # this is called with the screen to draw the item
+        self.phase = phase          # the frame profiler counts the time it takes to draw the item towards this phase
+
+
+# this draws every item onto the screen (what the simulator does when it isn't using dirty rectangles)
+# if a profiler is given, the time each item takes is added to its phase (see profiler.py)
+def draw_scene(screen, background_color, items, profiler=None):
+    screen.fill(background_color)
+    if profiler is not None:
+        profiler.lap("clear")
+    for item in items:
+        item.draw(screen)
+        if profiler is not None:
+            profiler.lap(item.phase)
+
+
+class DirtyRenderer:
+    # if the changed parts add up to more than full_update_fraction of the screen, the whole screen is drawn and flipped instead
+    def __init__(self, screen, background_color, full_update_fraction=0.5):
+        self.screen = screen
+        self.background_color = background_color
+        self.full_update_fraction = full_update_fraction
+        self.previous = None        # name -> (rect, key) of every item on the screen right now (None means redraw everything)
+        self.updated_area = 0       # the number of pixels sent to the display last frame
+
+    # this makes the next frame redraw the whole screen (e.g. after the window was covered up)
+    def invalidate(self):
+        self.previous = None
+
+    # this returns the rectangles that have to be redrawn to go from the previous frame to items
+    def dirty_rects(self, items):
+        screen_rect = self.screen.get_rect()
+        if self.previous is None:
+            return [screen_rect]
+
+        rects = []
+        names = set()
+        for item in items:
+            names.add(item.name)
+            before = self.previous.get(item.name)
+            if before is None:
+                rects.append(item.rect)                 # it just showed up
+            elif before[0] != item.rect or before[1] != item.key:
+                rects.append(before[0])                 # erase where it was
+                rects.append(item.rect)                 # and draw where it is
+        for name in self.previous:
+            if name not in names:
+                rects.append(self.previous[name][0])    # it just went away
+
+        rects = [rect.clip(screen_rect) for rect in rects]
+        return merge_rects([rect for rect in rects if rect.width > 0 and rect.height > 0])
+
+    # this draws the items onto the screen and updates the parts of the display that changed
+    def render(self, items, profiler=None):
+        rects = self.dirty_rects(items)
+        self.previous = {}
+        for item in items:
+            self.previous[item.name] = (item.rect, item.key)
+
+        screen_area = self.screen.get_width() * self.screen.get_height()
+        area = sum(rect.width * rect.height for rect in rects)
+        if area > screen_area * self.full_update_fraction:
+            draw_scene(self.screen, self.background_color, items, profiler)
+            pygame.display.flip()
+            self.updated_area = screen_area
+        else:
+            for rect in rects:
+                self.screen.set_clip(rect)              # only the pixels inside rect get touched
+                self.screen.fill(self.background_color)
+                if profiler is not None:
+                    profiler.lap("clear")
+                for item in items:
+                    if item.rect.colliderect(rect):
+                        item.draw(self.screen)
+                        if profiler is not None:
+                            profiler.lap(item.phase)
+            self.screen.set_clip(None)
+            if rects:
+                pygame.display.update(rects)
+            self.updated_area = area
+        if profiler is not None:
+            profiler.lap("display")
+
+
+# this joins rectangles that overlap so no part of the screen is drawn twice
+def merge_rects(rects):
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        i = 0
+        while i < len(merged):
+            if merged[i].colliderect(rect):
+                rect.union_ip(merged.pop(i))
+                i = 0                                   # the bigger rectangle might overlap one that was already checked
+            else:
+                i = i + 1
+        merged.append(rect)
+    return merged
@@ -0,0 +1,269 @@
+#
+# This is the simulation core of the time dilation simulator.
+#
+# It holds everything that decides what the calendars say: the proper time (and so the date and age) of each observer,
+# the ship's location and the travel mode. It doesn't import pygame, so it runs without a display
+# (on CI or on a server) and the interactive simulator in simulator.py is just one program that uses it.
+#
+# Usage:
+#
+#     engine = Engine()
+#     engine.step(16, ["RIGHT"])      # 16 milliseconds go by and the ship moves one step to the right
+#     engine.state.earth_date, engine.state.ship_date
+#
+
+##########################
+
+from datetime import date
+
+from dilation import MILLISECONDS_PER_DAY, dilation_tables
+
+
+# MODES of play (whose perspective the calendars are seen from)
+MODES = ["EARTH", "THE SPACESHIP"]
+
+# the three regions the ship can be in
+TRAVEL_MODES = ["near Earth", "interstellar", "near black hole"]
+
+# the inputs step() understands (each one is one key press in the simulator)
+RIGHT = "RIGHT"     # move the ship one step towards the black hole
+LEFT = "LEFT"       # move the ship one step towards Earth
+TAB = "TAB"         # switch between the Earth and the spaceship perspectives
+
+# the number of days in a year when working out the ages
+DAYS_PER_YEAR = 365
+
+# the size of the window the simulator draws in and the width of the Earth image (Earth has to scroll off the screen before the ship leaves)
+WINDOW_WIDTH = 1300
+EARTH_WIDTH = 711
+
+# The simulation moves forward in fixed steps no matter how fast the screen is drawn, so it behaves the same at any frame rate
+# (the simulator and the sweeps both step by STEP_TIME).
+SIMULATION_HZ = 60                  # simulation steps per second
+STEP_TIME = 1000 / SIMULATION_HZ    # milliseconds per simulation step (the simulator's clocks count whole milliseconds, see replay.py)
+
+
+# This is the proper time of one observer (the person on Earth or the person on the ship).
+# It counts the whole days that have gone by on their calendar since the start plus the fraction of the day in progress,
+# so advancing it by any number of milliseconds is one multiplication and nothing is lost when a day rolls over.
+class ProperTime:
+    def __init__(self, start_date, start_age):
+        self.start_date = start_date
+        self.start_age = start_age
+        self.days = 0               # whole days since start_date
+        self.fraction = 0.0         # how much of the current day has gone by (between 0 and 1)
+        self.max_days = date.max.toordinal() - start_date.toordinal()   # the calendar stops at the last date Python can show
+
+    # this lets dt milliseconds go by at rate days per millisecond
+    def advance(self, dt, rate):
+        total = self.fraction + dt * rate
+        whole = int(total)
+        self.days = self.days + whole
+        self.fraction = total - whole
+        if self.days >= self.max_days:
+            self.days = self.max_days
+            self.fraction = 0.0
+
+    def date(self):
+        return date.fromordinal(self.start_date.toordinal() + self.days)
+
+    # this is the age of the observer (a year goes by every DAYS_PER_YEAR days of their proper time)
+    def age(self):
+        return self.start_age + self.days // DAYS_PER_YEAR
+
+    # this returns the next count (date, age) pairs the calendar will show if dt milliseconds keep going by at rate
+    # (a day at a time, or a step's worth of days at a time once a step is longer than a day)
+    def upcoming(self, dt, rate, count):
+        start = self.start_date.toordinal()
+        upcoming = []
+        for k in range(1, count + 1):
+            days = min(self.days + max(k, int(self.fraction + k * dt * rate)), self.max_days)
+            upcoming.append((date.fromordinal(start + days), self.start_age + days // DAYS_PER_YEAR))
+        return upcoming
+
+
+class SimulationState:
+    def __init__(self, start_date, start_age, ship_location, earth_x, black_hole_x):
+        # this is the mode of play (between "staying on Earth" or "going on the ship")
+        self.k = 0
+        self.mode = MODES[self.k]
+
+        # the location of the ship with respect to the simulation (it starts off at Earth at -1, which keeps it in "near Earth")
+        self.ship_location = ship_location
+        self.facing = "RIGHT"
+        self.travel_mode = TRAVEL_MODES[0]
+        self.running = True         # this turns False once the ship reaches the event horizon
+
+        # the screen positions that decide when things happen (Earth has to scroll off the screen before the ship leaves)
+        self.earth_x = earth_x
+        self.black_hole_x = black_hole_x
+        self.black_hole_speed = 1
+
+        # the proper time of both perspectives and the dates and ages that go with them
+        self.earth_time = ProperTime(start_date, start_age)
+        self.ship_time = ProperTime(start_date, start_age)
+        self.earth_date = start_date
+        self.ship_date = start_date
+        self.earth_age = start_age
+        self.ship_age = start_age
+        self.jump_days = 1
+
+        self.elapsed = 0            # milliseconds since the simulation started
+
+
+class Engine:
+    def __init__(self, bh_location=1000, eh_location=2000, milliseconds_per_day=MILLISECONDS_PER_DAY, speed=5, ship_speed=1,
+                 window_width=WINDOW_WIDTH, earth_width=EARTH_WIDTH, start_date=None, start_age=20, model="toy"):
+        self.bh_location = bh_location                      # this is the number of lightyears from earth
+        self.eh_location = eh_location                      # this is the location of the event horizon
+        self.milliseconds_per_day = milliseconds_per_day
+        self.model = model                                  # the gravity model the day lengths come from (see gravity.py)
+        self.speed = speed                                  # this is how far Earth moves on the screen for every step of the ship
+        self.ship_speed = ship_speed                        # this is the speed the ship travels in the simulation
+        self.window_width = window_width
+        self.earth_width = earth_width
+        if start_date is None:
+            start_date = date.today()
+        self.state = SimulationState(start_date, start_age, -1, window_width // 2, window_width)
+        self.dilation = dilation_tables(bh_location, eh_location, milliseconds_per_day, model)
+        self.star_moves = []        # the star layers' moves during the last step as (steps, travel mode) so the simulator can scroll them
+
+    # this is the right edge of Earth on the screen (the same as the Earth sprite's rect.right)
+    def earth_right(self):
+        return self.state.earth_x - self.earth_width // 2 + self.earth_width
+
+    # this is the distance from the ship to the event horizon
+    def radius(self):
+        return self.eh_location - self.state.ship_location
+
+    # this returns the dilation tables for the current configuration (they're looked up again if bh_location, eh_location, milliseconds_per_day or model change)
+    def tables(self):
+        if self.dilation.key != (self.bh_location, self.eh_location, self.milliseconds_per_day, self.model):
+            self.dilation = dilation_tables(self.bh_location, self.eh_location, self.milliseconds_per_day, self.model)
+        return self.dilation
+
+    # this decides the current travel mode from the ship's location
+    def update_travel_mode(self):
+        state = self.state
+        if state.ship_location < 0:
+            state.travel_mode = "near Earth"
+        elif state.ship_location < self.bh_location:
+            state.travel_mode = "interstellar"
+        else:
+            state.travel_mode = "near black hole"
+        if state.travel_mode == "near black hole" and self.radius() <= 0:
+            state.running = False           # the ship is stuck in the event horizon
+
+    # this lets dt milliseconds go by and then applies the inputs (a list of RIGHT, LEFT and TAB) in order
+    def step(self, dt, inputs=()):
+        self.star_moves = []
+        self.update_timers(dt)
+        for action in inputs:
+            if action == TAB:
+                self.switch_mode()
+            elif action == RIGHT or action == LEFT:
+                self.move(action)
+            self.update_travel_mode()
+        self.update_travel_mode()
+        return self.state
+
+    def switch_mode(self):
+        state = self.state
+        state.k = (state.k + 1) % len(MODES)
+        state.mode = MODES[state.k]
+
+    ###############################
+    # update timers and calendars #
+    ###############################
+
+    # this returns how fast each calendar runs (in days per millisecond) from the current mode and the ship's distance to the event horizon
+    # (a day that rounds to 0 milliseconds counts as 1, so it goes by every millisecond like the original went by every frame)
+    def rates(self):
+        state = self.state
+        tables = self.tables()
+        normal = 1 / self.milliseconds_per_day
+
+        if state.mode == "EARTH":
+            # Earth's clock runs normally and the ship's day is longer near the black hole
+            earth_rate = normal
+            if state.travel_mode == "near black hole":
+                ship_rate = 1 / max(tables.slower(self.radius()), 1)
+            else:
+                ship_rate = normal
+        else:
+            # the ship's clock runs normally and Earth's day is shorter near the black hole (and it jumps several days at a time)
+            ship_rate = normal
+            state.jump_days = tables.jump(self.radius(), state.jump_days)
+            if state.travel_mode == "near black hole":
+                earth_rate = state.jump_days / max(tables.faster(self.radius()), 1)
+            else:
+                earth_rate = state.jump_days * normal
+        return (earth_rate, ship_rate)
+
+    # this predicts the next count dates and ages of Earth's calendar and the ship's if the ship stays where it is
+    # (the simulator uses it to render the calendars before they're shown, see hud.py)
+    def upcoming_calendars(self, dt, count):
+        state = self.state
+        (earth_rate, ship_rate) = self.rates()      # (this only sets state.jump_days to what the next step would set it to)
+        return (state.earth_time.upcoming(dt, earth_rate, count), state.ship_time.upcoming(dt, ship_rate, count))
+
+    # this is the length (in milliseconds) of the day that's dilated right now: the ship's longer day (SLOWER_DAY) seen from Earth
+    # or Earth's shorter day (FASTER_DAY) seen from the ship, and a normal day away from the black hole
+    def day_length(self):
+        if self.state.travel_mode != "near black hole":
+            return self.milliseconds_per_day
+        if self.state.mode == "EARTH":
+            return self.tables().slower(self.radius())
+        return self.tables().faster(self.radius())
+
+    # this lets dt milliseconds go by on both calendars (the rates don't change in between because the ship only moves on an input)
+    def update_timers(self, dt):
+        state = self.state
+        state.elapsed = state.elapsed + dt
+        (earth_rate, ship_rate) = self.rates()
+        state.earth_time.advance(dt, earth_rate)
+        state.ship_time.advance(dt, ship_rate)
+
+        state.earth_date = state.earth_time.date()
+        state.ship_date = state.ship_time.date()
+        state.earth_age = state.earth_time.age()
+        state.ship_age = state.ship_time.age()
+
+    ###############
+    # moving ship #
+    ###############
+
+    # this moves the ship one step in the direction of facing ("RIGHT" or "LEFT")
+    def move(self, facing):
+        state = self.state
+        state.facing = facing
+
+        if facing == "RIGHT":
+            if state.travel_mode == "near Earth":
+                state.earth_x = state.earth_x - self.speed
+                if self.earth_right() <= 0:
+                    state.ship_location = 0
+            elif state.travel_mode == "interstellar":
+                self.star_moves.append((1, state.travel_mode))
+                state.ship_location = state.ship_location + self.ship_speed
+            elif state.travel_mode == "near black hole":
+                self.star_moves.append((1, state.travel_mode))
+                state.ship_location = state.ship_location + self.ship_speed
+                if self.radius() % 3 == 0:
+                    state.black_hole_speed = 2
+                else:
+                    state.black_hole_speed = 1
+                state.black_hole_x = state.black_hole_x - state.black_hole_speed
+
+        elif facing == "LEFT":
+            if state.travel_mode == "near Earth":
+                if self.earth_right() < self.window_width:
+                    state.earth_x = state.earth_x + self.speed
+            elif state.travel_mode == "interstellar":
+                self.star_moves.append((-1, state.travel_mode))
+                if state.ship_location >= 0:
+                    state.ship_location = state.ship_location - self.ship_speed
+            elif state.travel_mode == "near black hole":
+                self.star_moves.append((-1, state.travel_mode))
+                state.ship_location = state.ship_location - self.ship_speed
+                state.black_hole_x = state.black_hole_x + state.black_hole_speed
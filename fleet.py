@@ -0,0 +1,125 @@
+#
+# This is the fleet of the simulator's fleet mode.
+#
+# Instead of one ship, a fleet flies thousands of ships from Earth towards the black hole, each at its own speed.
+# Every ship's location and proper time (whole days plus the fraction of the day in progress, like ProperTime in engine.py)
+# is one entry of a NumPy array, and the day lengths come out of the same dilation tables as the single ship's,
+# so stepping 10k ships is a handful of array operations and no calendar is made for any one ship.
+#
+# The fleet is always seen from Earth: Earth's clock runs normally and each ship's clock slows down near the black hole.
+# A ship that reaches the event horizon is stuck there and its clock stops.
+#
+# Usage:
+#
+#     fleet = Fleet(10000)
+#     fleet.step(16)                  # 16 milliseconds go by on Earth and every ship moves on
+#     fleet.summary(), fleet.heatmap(100, 24)
+#
+
+##########################
+
+from datetime import date
+
+import numpy
+
+from dilation import MILLISECONDS_PER_DAY, dilation_tables
+from engine import DAYS_PER_YEAR
+
+
+class Fleet:
+    # the ships fly between min_speed and max_speed locations per second (picked at random with seed)
+    def __init__(self, count, bh_location=1000, eh_location=2000, milliseconds_per_day=MILLISECONDS_PER_DAY,
+                 start_date=None, start_age=20, min_speed=20, max_speed=120, seed=None, model="toy"):
+        if start_date is None:
+            start_date = date.today()
+        self.count = count
+        self.bh_location = bh_location
+        self.eh_location = eh_location
+        self.milliseconds_per_day = milliseconds_per_day
+        self.start_date = start_date
+        self.start_age = start_age
+        self.max_days = date.max.toordinal() - start_date.toordinal()
+
+        # slower_day[R - 1] is the length of the ship's day (in milliseconds) at distance R from the event horizon
+        tables = dilation_tables(bh_location, eh_location, milliseconds_per_day, model)
+        self.slower_day = numpy.array(tables.slower_day[1:], dtype=numpy.float64)
+
+        random = numpy.random.default_rng(seed)
+        self.speed = random.uniform(min_speed, max_speed, count)   # locations per second
+        self.location = numpy.zeros(count, dtype=numpy.int64)      # every ship starts at Earth
+        self.move_credit = numpy.zeros(count)                       # fractions of a location each ship has flown
+        self.days = numpy.zeros(count, dtype=numpy.int64)           # whole days since start_date on each ship's calendar
+        self.fraction = numpy.zeros(count)                          # how much of each ship's current day has gone by
+
+        self.earth_days = 0         # whole days since start_date on Earth's calendar
+        self.earth_fraction = 0.0
+
+    # this is how fast each ship's calendar runs (in days per millisecond of Earth's time)
+    def rates(self):
+        radius = self.eh_location - self.location
+        day = self.slower_day[numpy.clip(radius, 1, len(self.slower_day)) - 1]
+        rate = numpy.where(self.location >= self.bh_location, 1 / day, 1 / self.milliseconds_per_day)
+        rate[radius <= 0] = 0                                       # time no longer exists in the event horizon
+        return rate
+
+    # this lets dt milliseconds go by on Earth's calendar and every ship's, and then moves the ships that aren't stuck
+    # (the calendars are ProperTime.advance() in engine.py for all the ships at once, capped at the last date the same way,
+    # so a change to one has to be made to the other too)
+    def step(self, dt):
+        total = self.earth_fraction + dt / self.milliseconds_per_day
+        whole = int(total)
+        self.earth_days = self.earth_days + whole
+        self.earth_fraction = total - whole
+        if self.earth_days >= self.max_days:
+            self.earth_days = self.max_days
+            self.earth_fraction = 0.0
+
+        total = self.fraction + dt * self.rates()
+        whole = numpy.floor(total)
+        self.days = self.days + whole.astype(numpy.int64)
+        self.fraction = total - whole
+        capped = self.days >= self.max_days
+        self.days[capped] = self.max_days
+        self.fraction[capped] = 0.0
+
+        self.move_credit = self.move_credit + dt * self.speed / 1000
+        steps = numpy.floor(self.move_credit)
+        self.move_credit = self.move_credit - steps
+        self.location = numpy.minimum(self.location + steps.astype(numpy.int64), self.eh_location)
+
+    def stuck(self):
+        return int(numpy.count_nonzero(self.location >= self.eh_location))
+
+    # this is how many days each ship's calendar is behind Earth's
+    def lag(self):
+        return self.earth_days - self.days
+
+    def ages(self):
+        return self.start_age + self.days // DAYS_PER_YEAR
+
+    # this returns the numbers the simulator shows for the fleet: Earth's date and the earliest, median and latest ship dates
+    def summary(self):
+        start = self.start_date.toordinal()
+        lag = self.lag()
+        return {
+            "ships": self.count,
+            "stuck": self.stuck(),
+            "earth_date": date.fromordinal(start + self.earth_days),
+            "earliest_date": date.fromordinal(start + int(self.days.min())),
+            "median_date": date.fromordinal(start + int(numpy.median(self.days))),
+            "latest_date": date.fromordinal(start + int(self.days.max())),
+            "youngest_age": int(self.ages().min()),
+            "max_lag": int(lag.max()),
+            "median_lag": float(numpy.median(lag)),
+        }
+
+    # This returns the number of ships in each cell of a location by lag grid (as an array of x_bins by y_bins).
+    # The columns split the way from Earth to the event horizon evenly and the rows go up in powers of two of the lag
+    # (row 0 is no lag, row 1 is 1 day, row 2 is 2 or 3 days, ...), so the ships near the black hole don't squash everyone else into one row.
+    def heatmap(self, x_bins, y_bins):
+        column = numpy.clip(self.location * x_bins // (self.eh_location + 1), 0, x_bins - 1)
+        lag = numpy.maximum(self.lag(), 0)
+        row = numpy.zeros(self.count, dtype=numpy.int64)
+        row[lag > 0] = numpy.floor(numpy.log2(lag[lag > 0])).astype(numpy.int64) + 1
+        row = numpy.minimum(row, y_bins - 1)
+        return numpy.bincount(column * y_bins + row, minlength=x_bins * y_bins).reshape(x_bins, y_bins)
@@ -0,0 +1,108 @@
+#
+# These are the gravity models the simulator can use to work out how much time slows down near the black hole.
+#
+# A model turns the ship's distance R from the event horizon into a dilation factor: how fast the ship's clock runs
+# compared to Earth's (1 far away, 0 at the event horizon). factor() works on a whole NumPy array of distances at once and
+# inverse() goes back from factors to distances. The simulation never calls a model while it runs: DilationTables
+# (see dilation.py) evaluates the chosen model once for every distance when a configuration is first used.
+#
+# D is the distance from the black hole's "mode" (where "near black hole" starts) to the event horizon.
+#
+# Usage:
+#
+#     model = MODELS["schwarzschild"]
+#     model.factor(numpy.arange(1, 1001), 1000)
+#
+
+##########################
+
+import numpy
+
+
+class DilationModel:
+    name = None
+    description = None
+    legacy_jumps = False        # True means Earth's calendar jumps by the original JUMP_DAYS ladder (see dilation.py), otherwise it moves a day at a time
+
+    # this returns the dilation factor (between 0 and 1) at every distance in radii
+    def factor(self, radii, distance):
+        raise NotImplementedError
+
+    # this returns the distance at which the dilation factor is each of factors (the opposite of factor())
+    def inverse(self, factors, distance):
+        raise NotImplementedError
+
+
+# This is the original curve of the simulator: (sqrt(1 - ((D - R)/D)**2))**2.
+# It isn't physical (time runs normally at the black hole's "mode" and stops at the event horizon) but it's easy to see.
+class ToyModel(DilationModel):
+    name = "toy"
+    description = "the original curve (sqrt(1 - ((D - R)/D)**2))**2"
+    legacy_jumps = True
+
+    def factor(self, radii, distance):
+        radii = numpy.asarray(radii, dtype=numpy.float64)
+        return numpy.sqrt(1 - ((distance - radii) / distance) ** 2) ** 2    # worked out the same way as SLOWER_DAY so the tables don't change
+
+    def inverse(self, factors, distance):
+        factors = numpy.asarray(factors, dtype=numpy.float64)
+        return distance - distance * numpy.sqrt(1 - factors)
+
+
+# This is the time dilation of a clock hovering outside a (non-rotating) black hole: sqrt(1 - r_s/r),
+# where r_s is the Schwarzschild radius and r = r_s + R is the clock's distance from the center.
+# horizon_fraction sets r_s as a fraction of D (so the dilation at the black hole's "mode" doesn't depend on the configuration).
+class SchwarzschildModel(DilationModel):
+    name = "schwarzschild"
+    description = "a clock hovering outside the black hole, sqrt(1 - r_s/r)"
+
+    def __init__(self, horizon_fraction=0.1):
+        self.horizon_fraction = horizon_fraction
+
+    def factor(self, radii, distance):
+        radii = numpy.maximum(numpy.asarray(radii, dtype=numpy.float64), 0)
+        r_s = self.horizon_fraction * distance
+        return numpy.sqrt(radii / (r_s + radii))
+
+    def inverse(self, factors, distance):
+        squared = numpy.asarray(factors, dtype=numpy.float64) ** 2
+        r_s = self.horizon_fraction * distance
+        with numpy.errstate(divide="ignore"):
+            return squared * r_s / (1 - squared)       # (a factor of 1 is infinitely far away)
+
+
+# This adds the special relativity of the ship's speed to the gravity: sqrt(1 - r_s/r) * sqrt(1 - v**2/c**2).
+# The ship falls towards the black hole at escape_fraction of the escape speed (sqrt(r_s/r) of the speed of light),
+# so with escape_fraction=1 (falling from rest far away) the factor is 1 - r_s/r.
+class FallingModel(SchwarzschildModel):
+    name = "falling"
+    description = "a ship falling into the black hole, gravity and speed, sqrt(1 - r_s/r) * sqrt(1 - v**2/c**2)"
+
+    def __init__(self, horizon_fraction=0.1, escape_fraction=1.0):
+        SchwarzschildModel.__init__(self, horizon_fraction)
+        self.escape_fraction = escape_fraction
+
+    def factor(self, radii, distance):
+        radii = numpy.maximum(numpy.asarray(radii, dtype=numpy.float64), 0)
+        r_s = self.horizon_fraction * distance
+        x = r_s / (r_s + radii)                                 # r_s/r (and (v/c)**2 = escape_fraction**2 * r_s/r)
+        return numpy.sqrt((1 - x) * (1 - self.escape_fraction ** 2 * x))
+
+    def inverse(self, factors, distance):
+        squared = numpy.asarray(factors, dtype=numpy.float64) ** 2
+        r_s = self.horizon_fraction * distance
+        k = self.escape_fraction ** 2
+        # factor**2 = (1 - x) * (1 - k*x) is a quadratic in x = r_s/r (the smaller root is the one outside the event horizon)
+        if k == 0:
+            x = 1 - squared
+        else:
+            x = ((1 + k) - numpy.sqrt((1 + k) ** 2 - 4 * k * (1 - squared))) / (2 * k)
+        with numpy.errstate(divide="ignore"):
+            return r_s / x - r_s
+
+
+MODELS = {
+    "toy": ToyModel(),
+    "schwarzschild": SchwarzschildModel(),
+    "falling": FallingModel(),
+}
@@ -0,0 +1,156 @@
+#
+# This prepares the surfaces of the calendars and the HUD's lines of text on a background thread before they're needed.
+#
+# Making a calendar (and rendering each of its lines) is the slowest part of a frame that isn't drawing, and near the
+# event horizon Earth's calendar changes every step and the distance changes with every key press. So every frame the
+# main loop tells the preparer what it expects to show next (the calendars predicted from how fast each one runs, see
+# Engine.upcoming_calendars, and the distances a step or two either way), and a worker thread renders them.
+#
+# SDL_ttf isn't safe to use from two threads at once, so the fonts the worker needs are built by the main thread (in want(),
+# with the main thread's TextCache) and both threads only render with FONT_LOCK held (see text_cache.py).
+#
+# The finished surfaces are handed back by swapping one dictionary for another: the worker never changes a dictionary once
+# it's handed over and assigning a reference is atomic, so neither thread takes a lock or waits for the other and the
+# main loop only looks the surfaces up and blits them. Anything that isn't ready yet is rendered right away like before.
+#
+# Usage:
+#
+#     hud = HudPreparer(text_cache, calendar_font, calendar_font_size, WHITE, background_color)
+#     hud.want([calendar_key(date, name, age), text_key(text, font, size, color, antialias), ...])   # what's shown now first
+#     hud.get(calendar_key(date, name, age))      # the finished surface (or None if it isn't ready)
+#     hud.close()
+#
+
+##########################
+
+import threading
+
+from collections import OrderedDict
+
+import pygame
+
+from calendars import create_calendar
+from text_cache import FONT_LOCK
+
+
+# the keys of the surfaces (a calendar is known by what it shows and its scale, see layout.py, a line of text by how it's rendered)
+def calendar_key(input_date, name_of_calendar, age, scale=1):
+    return ("calendar", input_date, name_of_calendar, age, scale)
+
+def text_key(text, name, size, color, antialias=True):
+    return ("text", text, name, size, tuple(color), antialias)
+
+
+class HudPreparer:
+    # the calendars are drawn with calendar_font at calendar_font_size in color on a width wide box of background_color
+    # (text_cache is the main thread's TextCache, the fonts are taken from it)
+    def __init__(self, text_cache, calendar_font, calendar_font_size, color, background_color, width=210, max_surfaces=128):
+        self.text_cache = text_cache
+        self.calendar_font = calendar_font
+        self.calendar_font_size = calendar_font_size
+        self.color = color
+        self.background_color = background_color
+        self.width = width
+        self.max_surfaces = max_surfaces    # the most surfaces the worker keeps (the ones wanted least recently are dropped)
+
+        self.ready = {}                     # key -> finished surface (the worker replaces the whole dictionary, it's never changed in place)
+        self.fonts = {}                     # (font name, font size) -> the font the main thread built (replaced as a whole as well)
+        self.wanted = ()                    # the keys the main loop expects to show next (replaced as a whole as well)
+        self.wake = threading.Event()
+        self.running = True
+        self.prepared = 0                   # the surfaces the worker rendered
+        self.hits = 0                       # get() calls that found their surface ready
+        self.misses = 0
+        self.thread = threading.Thread(target=self.run, name="hud", daemon=True)
+        self.thread.start()
+
+    # this tells the worker what to have ready (the keys shown right now should come first since they're rendered first)
+    def want(self, keys):
+        keys = tuple(keys)
+        if keys != self.wanted:
+            missing = set(self.font_of(key) for key in keys) - set(self.fonts)
+            if missing:
+                fonts = dict(self.fonts)
+                for (name, size) in missing:
+                    fonts[(name, size)] = self.text_cache.font(name, size)
+                self.fonts = fonts          # (built here on the main thread before the worker sees the keys)
+            self.wanted = keys
+            self.wake.set()
+
+    # this is the (font name, font size) the key is rendered with
+    def font_of(self, key):
+        if key[0] == "calendar":
+            return (self.calendar_font, max(1, round(self.calendar_font_size * key[4])))
+        return (key[2], key[3])
+
+    # this returns the finished surface for the key, or None if the worker hasn't got to it yet
+    def get(self, key):
+        surface = self.ready.get(key)
+        if surface is None:
+            self.misses = self.misses + 1
+        else:
+            self.hits = self.hits + 1
+        return surface
+
+    # this returns the fraction of get() calls that found their surface ready
+    def hit_rate(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def close(self):
+        self.running = False
+        self.wake.set()
+        self.thread.join()
+
+    ##############################
+    # the background thread      #
+    ##############################
+
+    def run(self):
+        surfaces = OrderedDict()            # key -> surface (least recently wanted first)
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            if not self.running:
+                break
+            wanted = self.wanted
+            for key in wanted:
+                if key in surfaces:
+                    surfaces.move_to_end(key)
+                    continue
+                surfaces[key] = self.render(key)
+                self.prepared = self.prepared + 1
+                self.hand_over(surfaces, wanted)        # each surface is handed over as soon as it's done
+                if self.wanted is not wanted:
+                    break                   # the main loop moved on, so start again with what it wants now
+            else:
+                self.hand_over(surfaces, wanted)
+            while len(surfaces) > self.max_surfaces:
+                surfaces.popitem(last=False)
+
+    # this swaps in a new dictionary of the wanted surfaces that are done (the old one is left as it was for the main loop)
+    def hand_over(self, surfaces, wanted):
+        self.ready = {key: surfaces[key] for key in wanted if key in surfaces}
+
+    def render(self, key):
+        font = self.fonts[self.font_of(key)]
+        if key[0] == "calendar":
+            return self.render_calendar(font, create_calendar(key[1], key[2], key[3]), key[4])
+        (kind, text, name, size, color, antialias) = key
+        with FONT_LOCK:
+            return font.render(text, antialias, color)
+
+    # this is the calendar on its box, the same as draw_calendar() in simulator.py draws it (without the border)
+    # (at scale, with the font rendered at the scaled size so it stays sharp)
+    def render_calendar(self, font, calendar_lines, scale):
+        height = round(1.33 * self.calendar_font_size * len(calendar_lines))
+        surface = pygame.Surface((round(self.width * scale), round(height * scale)))
+        surface.fill(self.background_color)
+        for i in range(0, len(calendar_lines)):
+            y = int(i * self.calendar_font_size * (1.33))
+            with FONT_LOCK:
+                line = font.render(calendar_lines[i], True, self.color)
+            surface.blit(line, (round(5 * scale), round(y * scale)))
+        return surface
@@ -0,0 +1,104 @@
+#
+# This is the layout of the simulator's window.
+#
+# Everything is placed in logical coordinates (the 1300 x 700 window the simulator was drawn for) and scaled to the real
+# window when it's drawn, so the same layout fits a small laptop window or a 4K exhibit screen. The scale keeps the shape
+# of the logical window (what's left of the real window is a border on two sides), so the logical point (x, y) is at
+# offset + (x, y) * scale on the screen.
+#
+# Images are scaled with smoothscale once per scale and kept (a scaled copy lives as long as the image it was made from),
+# and text is rendered at the scaled font size so it stays sharp, so nothing is rescaled every frame. Resizing the window
+# doesn't throw anything away: the copies for a new scale are only made as they're drawn, a resize that keeps the scale
+# (only the border changes) makes none, and going back to the scale before finds its copies still there.
+#
+# Usage:
+#
+#     layout = Layout((1300, 700))
+#     layout.resize(screen.get_size())
+#     screen.blit(layout.surface(image), layout.point(x, y))
+#     font = pygame.font.SysFont("Courier", layout.font_size(16))
+#
+
+##########################
+
+import weakref
+
+from collections import OrderedDict
+
+import pygame
+
+
+# this returns a copy of image smoothscaled by scale (with the same colorkey, run-length encoded like the original)
+def scaled_copy(image, scale):
+    size = (max(1, round(image.get_width() * scale)), max(1, round(image.get_height() * scale)))
+    copy = pygame.transform.smoothscale(image, size)
+    colorkey = image.get_colorkey()
+    if colorkey is not None:
+        copy.set_colorkey(colorkey, pygame.RLEACCEL)
+        pygame.Surface((1, 1)).blit(copy, (0, 0))      # the first blit run-length encodes the surface, so do it now instead of in the middle of a frame
+    return copy
+
+
+class Layout:
+    # max_scales is the number of scales whose copies are kept (the least recently used scale is forgotten first)
+    def __init__(self, logical_size, max_scales=2):
+        (self.width, self.height) = logical_size
+        self.window_size = logical_size
+        self.scale = 1.0
+        self.offset = (0, 0)                # the screen position of the logical point (0, 0)
+        self.max_scales = max_scales
+        self.copies = OrderedDict()         # scale -> (image -> scaled copy), least recently used scale first
+        self.scaled = 0                     # the number of copies made so far
+
+    # this fits the logical window into a window of the given size (it returns True if the scale changed)
+    def resize(self, window_size):
+        (width, height) = window_size
+        scale = min(width / self.width, height / self.height)
+        changed = scale != self.scale
+        self.window_size = (width, height)
+        self.scale = scale
+        self.offset = ((width - round(self.width * scale)) // 2, (height - round(self.height * scale)) // 2)
+        if scale in self.copies:
+            self.copies.move_to_end(scale)
+        return changed
+
+    # this is where the logical point (x, y) is on the screen
+    def point(self, x, y):
+        return (self.offset[0] + round(x * self.scale), self.offset[1] + round(y * self.scale))
+
+    # this is the screen rectangle a logical rectangle covers
+    def rect(self, rect):
+        rect = pygame.Rect(rect)
+        (left, top) = self.point(rect.left, rect.top)
+        (right, bottom) = self.point(rect.right, rect.bottom)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    # this is a logical length (like a border width) on the screen (never less than a pixel unless it's 0)
+    def length(self, length):
+        if length == 0:
+            return 0
+        return max(1, round(length * self.scale))
+
+    def font_size(self, size):
+        return max(1, round(size * self.scale))
+
+    # this is the whole logical window on the screen
+    def screen_rect(self):
+        return self.rect((0, 0, self.width, self.height))
+
+    # this returns image at the current scale (made the first time it's asked for at this scale and kept as long as image is)
+    def surface(self, image):
+        if self.scale == 1:
+            return image
+        copies = self.copies.get(self.scale)
+        if copies is None:
+            copies = weakref.WeakKeyDictionary()
+            self.copies[self.scale] = copies
+            if len(self.copies) > self.max_scales:
+                self.copies.popitem(last=False)
+        copy = copies.get(image)
+        if copy is None:
+            copy = scaled_copy(image, self.scale)
+            copies[image] = copy
+            self.scaled = self.scaled + 1
+        return copy
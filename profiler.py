@@ -0,0 +1,122 @@
+#
+# This is the frame profiler built into the simulator.
+#
+# Every frame is split into phases (event polling, the simulation steps, drawing the stars, ...) and the time spent in
+# each one is kept in a fixed-size ring buffer, so the last few seconds of frames can always be looked at without the
+# memory growing. The simulator can show the rolling p50/p99 of each phase on the screen and save the buffer to a CSV file.
+#
+# Usage:
+#
+#     profiler.start_frame()
+#     ...                         # poll the events
+#     profiler.lap("events")      # everything since the last lap counts as "events"
+#     ...
+#     profiler.end_frame()
+#
+
+##########################
+
+import csv
+import time
+
+import numpy
+
+
+class FrameProfiler:
+    def __init__(self, phases, capacity=600):
+        self.phases = list(phases)
+        self.index = {}                                             # phase name -> column in the buffer
+        for i in range(0, len(self.phases)):
+            self.index[self.phases[i]] = i
+        self.capacity = capacity                                    # the number of frames kept
+        self.times = numpy.zeros((capacity, len(self.phases)))     # milliseconds per frame (rows) and phase (columns)
+        self.frame_numbers = numpy.zeros(capacity, dtype=numpy.int64)
+        self.frames = 0                                             # the number of frames recorded so far
+        self.current = numpy.zeros(len(self.phases))
+        self.last = time.perf_counter()
+        self.listener = None        # an object that's told about every frame and lap too (like the AllocationMonitor in allocations.py)
+
+    def start_frame(self):
+        self.current[:] = 0
+        if self.listener is not None:
+            self.listener.start_frame()
+        self.last = time.perf_counter()
+
+    # this adds the time since the last lap (or the start of the frame) to the given phase
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.current[self.index[phase]] += (now - self.last) * 1000
+        if self.listener is not None:
+            self.listener.lap(phase)
+            now = time.perf_counter()   # (the listener's time doesn't count towards the next phase)
+        self.last = now
+
+    def end_frame(self):
+        if self.listener is not None:
+            self.listener.end_frame()
+        row = self.frames % self.capacity
+        self.times[row] = self.current
+        self.frame_numbers[row] = self.frames
+        self.frames = self.frames + 1
+
+    # this returns the recorded rows from the oldest to the newest
+    def rows(self):
+        if self.frames <= self.capacity:
+            return (self.frame_numbers[:self.frames], self.times[:self.frames])
+        start = self.frames % self.capacity
+        order = numpy.concatenate((numpy.arange(start, self.capacity), numpy.arange(0, start)))
+        return (self.frame_numbers[order], self.times[order])
+
+    # this returns a list of (phase, p50, p99) in milliseconds with a "frame" entry at the end for the whole frame
+    def percentiles(self):
+        (numbers, times) = self.rows()
+        if len(times) == 0:
+            return []
+        results = []
+        p50 = numpy.percentile(times, 50, axis=0)
+        p99 = numpy.percentile(times, 99, axis=0)
+        for i in range(0, len(self.phases)):
+            results.append((self.phases[i], p50[i], p99[i]))
+        totals = times.sum(axis=1)
+        results.append(("frame", numpy.percentile(totals, 50), numpy.percentile(totals, 99)))
+        return results
+
+    # this returns the lines of text shown in the on-screen overlay
+    def overlay_lines(self):
+        lines = ["%-16s %6s %6s" % ("phase (ms)", "p50", "p99")]
+        for (phase, p50, p99) in self.percentiles():
+            lines.append("%-16s %6.2f %6.2f" % (phase, p50, p99))
+        return lines
+
+    # this writes every frame in the buffer to a CSV file (one row per frame, one column per phase)
+    def dump_csv(self, path):
+        (numbers, times) = self.rows()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame"] + self.phases + ["total"])
+            for i in range(0, len(times)):
+                writer.writerow([int(numbers[i])] + ["%.4f" % t for t in times[i]] + ["%.4f" % times[i].sum()])
+
+
+# This times the steps of the simulator's startup (importing the modules, opening the window, loading the images, ...)
+# up to the first frame on the screen, so a slow start can be traced to the step that got slower.
+class StartupProfile:
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.last = self.started
+        self.phases = []            # (phase, milliseconds) in the order they happened
+
+    # this counts the time since the last lap (or the start) as the given phase
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    # this is the time from the start to the last lap
+    def total(self):
+        return (self.last - self.started) * 1000
+
+    def lines(self):
+        lines = ["%-16s %8.1f ms" % (phase, ms) for (phase, ms) in self.phases]
+        lines.append("%-16s %8.1f ms" % ("total", self.total()))
+        return lines
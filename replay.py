@@ -0,0 +1,130 @@
+#
+# This records the events the simulator's main loop consumes and plays them back exactly.
+#
+# A log is a small header (the format version, the start date, the seed the stars were made with and the gravity model) followed by one
+# 9 byte record per event: the simulation time in milliseconds when it was consumed, its type and its key.
+# The simulation time is what the clocks below return (not the wall clock), so a replay posts every event
+# before the same simulation step it came before when it was recorded, whether it's played back in real time or as fast as possible.
+#
+# Usage:
+#
+#     simulator.py --record flight.log
+#     simulator.py --replay flight.log              # in real time
+#     simulator.py --replay flight.log --max-speed  # as fast as the CPU allows
+#
+
+##########################
+
+import struct
+
+from datetime import date
+
+import pygame
+
+from dilation import MODEL_NAMES
+
+
+MAGIC = b"TDSL"
+VERSION = 2
+HEADER = struct.Struct("<4sBIQB")   # magic, version, start date (as an ordinal), seed, gravity model (an index into MODEL_NAMES)
+RECORD = struct.Struct("<IBI")      # simulation time (ms), event type, key
+
+# the events that are recorded (everything else the main loop sees doesn't change the simulation)
+# quitting isn't recorded, a replay stops at the END record instead (after the steps the last frame of the recording ran)
+END = 0                             # the last record of a log (its time is when the recording stopped)
+EVENT_CODES = {pygame.KEYDOWN: 2, pygame.KEYUP: 3}
+EVENT_TYPES = {2: pygame.KEYDOWN, 3: pygame.KEYUP}
+
+
+###########
+# clocks  #
+###########
+
+# The simulator's clocks count the milliseconds of simulation time since the start (as whole numbers).
+# advance() moves the clock forward for the next frame, never past limit (the time of the next event of a replay).
+
+class WallClock:
+    def __init__(self, max_frame_time):
+        self.max_frame_time = max_frame_time    # a frame that took longer than this only counts as this many milliseconds
+        self.now = 0
+        self.last = pygame.time.get_ticks()
+
+    def advance(self, limit=None):
+        ticks = pygame.time.get_ticks()
+        self.now = self.now + min(ticks - self.last, self.max_frame_time)
+        self.last = ticks
+        if limit is not None and self.now > limit:
+            self.now = limit
+        return self.now
+
+
+# this clock moves forward exactly one simulation step per frame (without looking at the real time)
+class VirtualClock:
+    def __init__(self, steps_per_second):
+        self.steps_per_second = steps_per_second
+        self.now = 0
+
+    def advance(self, limit=None):
+        next_step = self.now * self.steps_per_second // 1000 + 1
+        self.now = -(-next_step * 1000 // self.steps_per_second)    # the first whole millisecond of the next step
+        if limit is not None and self.now > limit:
+            self.now = limit
+        return self.now
+
+
+##############
+# recording  #
+##############
+
+class InputRecorder:
+    def __init__(self, path, start_date, seed, model="toy"):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, start_date.toordinal(), seed, MODEL_NAMES.index(model)))
+        self.count = 0
+
+    # this writes the event to the log if it's one that changes the simulation
+    def record(self, now, event):
+        code = EVENT_CODES.get(event.type)
+        if code is None:
+            return
+        self.file.write(RECORD.pack(now, code, getattr(event, "key", 0)))
+        self.count = self.count + 1
+
+    def close(self, now):
+        self.file.write(RECORD.pack(now, END, 0))
+        self.file.close()
+
+
+class InputLog:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size or data[:4] != MAGIC or data[4] != VERSION:
+            raise ValueError(path + " isn't a version " + str(VERSION) + " input log")
+        (magic, version, start_ordinal, seed, model) = HEADER.unpack_from(data, 0)
+        self.start_date = date.fromordinal(start_ordinal)
+        self.seed = seed
+        self.model = MODEL_NAMES[model]
+        self.records = list(RECORD.iter_unpack(data[HEADER.size:]))
+        self.position = 0           # the index of the next record to play back
+        self.end = None             # the time the recording stopped (if the log got that far)
+        if self.records and self.records[-1][1] == END:
+            self.end = self.records.pop()[0]
+
+    # this returns the events that were consumed at or before the simulation time now (each one is only returned once)
+    def due(self, now):
+        events = []
+        while self.position < len(self.records) and self.records[self.position][0] <= now:
+            (time, code, key) = self.records[self.position]
+            events.append(pygame.event.Event(EVENT_TYPES[code], key=key))
+            self.position = self.position + 1
+        return events
+
+    # this is the time of the next event (or the end of the recording), which the clock mustn't skip past
+    def next_time(self):
+        if self.position < len(self.records):
+            return self.records[self.position][0]
+        return self.end
+
+    def finished(self, now):
+        return self.position >= len(self.records) and self.end is not None and now >= self.end
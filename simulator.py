@@ -6,22 +6,43 @@
 #
 # There are two calendars on the screen and each represents their respective date (on Earth or on the ship).
 # To switch between calendars, hit the TAB button.
+# To see how long each part of a frame takes, hit the F3 button.
+# To fly thousands of ships at once and see how far their calendars spread apart, start it with --fleet 10000.
 #
 # If you get too close to the black hole's event horizon, you will get stuck and the simulation will end.
 #
 
 ##########################
 
+import time
+STARTED = time.perf_counter()   # this is used to measure how long the simulator takes to show its first frame
+
+import argparse
+import json
+import os
 import pygame
+import numpy
 import random
-import math
-import time
 from pygame.locals import *
 
-import calendar
-
 from datetime import date
-from datetime import timedelta
+
+from engine import Engine, MODES, TRAVEL_MODES, MILLISECONDS_PER_DAY, SIMULATION_HZ, STEP_TIME, RIGHT, LEFT, TAB
+from dilation import MODEL_NAMES
+from calendars import create_calendar
+from text_cache import TextCache
+from assets import AssetManager
+from starfield import StarField, StarLayer, ChunkedStarLayer
+from dirty_render import SceneItem, DirtyRenderer, draw_scene
+from profiler import FrameProfiler, StartupProfile
+from replay import WallClock, VirtualClock, InputRecorder, InputLog
+from fleet import Fleet
+from telemetry import TelemetryWriter
+from hud import HudPreparer, calendar_key, text_key
+from capture import FrameCapture, FORMATS
+from layout import Layout
+from allocations import AllocationMonitor
+from checkpoint import Checkpoint, CheckpointWriter, pack_checkpoint
 
 
 
@@ -53,27 +74,76 @@ calendar_font = 'Courier'
 mode_font_size = 24      # 1 point font equals to 1 1/3 pixels
 mode_font = 'Courier'
 
-MONTH = [None, "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]  # MONTH[i] provides a string of the month name
-
-# set up pygame
-pygame.init()
-all_sprites = pygame.sprite.Group()
-
-# set up display window
+SHOW_ASSET_REPORT = False   # set this to True to print the load time and memory of every image at startup
+
+dirty_rect_rendering = False    # set this to True to only redraw and update the parts of the screen that changed (much less work when the ship is idle)
+prepare_hud = True              # set this to False to render the calendars and the HUD's text during the frame instead of ahead of time on a background thread (see hud.py)
+hud_lookahead = 4               # how many of the next dates of each calendar (and steps of the ship either way) are rendered ahead of time
+
+# The simulation moves forward in fixed steps of STEP_TIME (SIMULATION_HZ steps per second, see engine.py) no matter how fast the screen is drawn.
+MAX_FRAME_TIME = 250                # a frame that took longer than this (e.g. the window was dragged) only counts as this many milliseconds
+render_fps = 60                     # frames drawn per second (0 draws as fast as possible)
+moves_per_second = 60               # how many steps the ship takes per second while an arrow key is held down
+
+# the frame profiler times each part of every frame (hit F3 to see the rolling p50/p99 of each part on the screen)
+PROFILE_PHASES = ["events", "keys", "simulation", "fleet", "star movement", "calendars", "clear", "star drawing", "sprite drawing", "hud drawing", "display", "capture"]
+profile_frames = 600        # the number of frames the profiler remembers
+profile_csv = None          # set this to a file name to save the profiler's frames to it when the simulator quits
+
+checkpoint_seconds = 5      # how often --checkpoint saves the flight (in seconds of real time)
+
+# this turns "1920x1080" into (1920, 1080)
+def window_size(text):
+    (width, height) = text.lower().split("x")
+    return (int(width), int(height))
+
+# command line options (these are mostly for benchmarks, see benchmark.py)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="A general relativity time dilation simulator.")
+    parser.add_argument("--script", help="a JSON file of key presses to play back ({\"events\": [[frame, \"KEYDOWN\" or \"KEYUP\", key name], ...]})")
+    parser.add_argument("--frames", type=int, help="quit after this many frames")
+    parser.add_argument("--lockstep", action="store_true", help="run exactly one simulation step per frame instead of following the real time")
+    parser.add_argument("--fps", type=int, default=render_fps, help="frames drawn per second (0 draws as fast as possible)")
+    parser.add_argument("--dirty-rects", action="store_true", help="only redraw and update the parts of the screen that changed")
+    parser.add_argument("--profile-csv", help="save the frame profiler's frames to this file when the simulator quits")
+    parser.add_argument("--report", help="write a JSON report of the run (frame times, startup time, peak memory) to this file")
+    parser.add_argument("--record", help="record every event the simulation consumes to this file so it can be replayed")
+    parser.add_argument("--replay", help="play back a file made with --record (the keyboard is ignored)")
+    parser.add_argument("--max-speed", action="store_true", help="play back --replay as fast as possible instead of in real time")
+    parser.add_argument("--seed", type=int, help="the seed the stars are made with (a replay uses the one it was recorded with)")
+    parser.add_argument("--telemetry", help="write a record of every simulation step to this file (see telemetry.py)")
+    parser.add_argument("--fleet", type=int, default=0, help="also fly this many ships towards the black hole and show how far their calendars spread apart")
+    parser.add_argument("--model", choices=MODEL_NAMES, default="toy", help="the gravity model time slows down by near the black hole (see gravity.py, a replay uses the one it was recorded with)")
+    parser.add_argument("--export", help="render without a window, one frame per simulation step, and write every frame to this directory (see capture.py)")
+    parser.add_argument("--export-format", choices=sorted(FORMATS), default="png", help="write the frames of --export as PNG files or as raw RGB files")
+    parser.add_argument("--export-live", action="store_true", help="capture the window as it's played in real time instead (the frames that can't be written in time are dropped)")
+    parser.add_argument("--export-workers", type=int, help="the number of threads writing the frames of --export (the number of cores by default)")
+    parser.add_argument("--allocations", help="trace the main loop's allocations and garbage collections per profiler phase and write them to this JSON (or .csv) file (see allocations.py)")
+    parser.add_argument("--allocation-every", type=int, default=600, help="compare a tracemalloc snapshot with the one before every this many frames (with --allocations)")
+    parser.add_argument("--checkpoint", help="save the flight to this file every few seconds and when the simulator quits (see checkpoint.py)")
+    parser.add_argument("--checkpoint-every", type=float, default=checkpoint_seconds, help="the seconds between the saves of --checkpoint")
+    parser.add_argument("--resume", action="store_true", help="carry on the flight saved in --checkpoint (a new flight starts if there isn't one)")
+    parser.add_argument("--window-size", type=window_size, help="open the window at this size (WIDTHxHEIGHT, everything is scaled to fit it)")
+    parser.add_argument("--startup-profile", action="store_true", help="print how long each step of the startup took (up to the first frame)")
+    args = parser.parse_args(argv)
+    if args.resume and args.checkpoint is None:
+        parser.error("--resume needs --checkpoint")
+    if args.resume and (args.record is not None or args.replay is not None):
+        parser.error("--resume can't be used with --record or --replay (their logs start at the beginning of a flight)")
+    return args
+
+# the window (it's only opened by main())
 background_color = BLACK
 (WINDOW_WIDTH, WINDOW_HEIGHT) = (1300, 700)
+SCREEN_RECT = pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+layout = Layout((WINDOW_WIDTH, WINDOW_HEIGHT))  # everything is placed in the logical WINDOW_WIDTH x WINDOW_HEIGHT window and scaled to the real one (see layout.py)
+text_cache = TextCache()    # this keeps the fonts and the rendered lines of text so they aren't rebuilt every frame (the fonts are only built once they're used)
 
-# define surface
-SCREEN = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption('Simulation')
 
 #####
 # simulation variables
 #####
 
-# MODES of play
-MODES = ["EARTH", "THE SPACESHIP"]
-
 # the simulation's location of everything with respect to lightyears
 earth_location = 0  # this is the Earth's location and is technically not necessary (it's included for ease of understanding the code)
 bh_location = 1000  # this is the number of lightyears from earth
@@ -82,11 +152,7 @@ ship_location = -1  # This is the location of the ship. It is between Earth and
 
 SPEED = 5       # this is the speed of everything on the screen
 ship_speed = 1  # this is the speed the ship travels in the simulation
-
-
-# initialize the current date
-earth_date = date.today()
-ship_date = date.today()
+start_age = 20  # this is how old the twins are when the simulation starts
 
 
 
@@ -97,31 +163,41 @@ ship_date = date.today()
 #######################################################################
 
 
+# the sprites are drawn in the order of their _layer (the ship is drawn over Earth and the black hole)
+
 class Ship(pygame.sprite.Sprite):
-    def __init__(self, x, y, location, speed, facing):
+    _layer = 1
+
+    def __init__(self, x, y, location, speed, facing, images):
         pygame.sprite.Sprite.__init__(self)
         self.x = x
         self.y = y
-        self.image = pygame.image.load('ship_right.png')
-        self.image.set_colorkey(background_color)
+        self.images = images                # this maps each facing ("RIGHT" or "LEFT") to its already loaded image
+        self.image = images[facing]
         self.rect = self.image.get_rect()
         self.rect.center = (self.x, self.y) # this is the location of the ship on the screen
         self.location = location            # this is the location of the ship with respect to the simulation
         self.speed = 1                      # this controls the speed of the ship WRT it's location in the simulation (not the screen position/speed)
         self.facing = facing
 
+    # this turns the ship around by swapping to the image that's already loaded for that facing
+    def turn(self, facing):
+        self.facing = facing
+        self.image = self.images[facing]
+
     def draw(self, screen):
         screen.blit(self.image, self.rect)
 
 
 class Earth(pygame.sprite.Sprite):
-    def __init__(self, x, y, location):
+    _layer = 0
+
+    def __init__(self, x, y, location, image):
         pygame.sprite.Sprite.__init__(self)
         self.location = location    # this is the location of Earth with respect to the simulation
         self.x = x
         self.y = y
-        self.image = pygame.image.load('earth.png')
-        self.image.set_colorkey(background_color)
+        self.image = image
         self.rect = self.image.get_rect()
         self.rect.center = (self.x, self.y)
 
@@ -134,18 +210,25 @@ class Earth(pygame.sprite.Sprite):
 
 
 class Black_hole(pygame.sprite.Sprite):
-    def __init__(self, x, y, location, event_horizon):
+    _layer = 0
+
+    def __init__(self, x, y, location, event_horizon, image):
         pygame.sprite.Sprite.__init__(self)
         self.location = location            # this is the location of Earth with respect to the simulation
         self.event_horizon = event_horizon  # this is the location of the event horizon with respect to the simulation
         self.x = x
         self.y = y
-        self.image = pygame.image.load('black hole.png')
-        # self.image = pygame.image.load('pink.png')
-        self.image.set_colorkey(background_color)
+        self.image = None
+        self.rect = pygame.Rect(self.x, self.y, 0, 0)
+        if image is not None:
+            self.set_image(image)
+        self.speed = 1
+
+    # the image can be given after the black hole is made (the simulator loads it after the first frame, it's the biggest one)
+    def set_image(self, image):
+        self.image = image
         self.rect = self.image.get_rect()
         self.rect.topleft = (self.x, self.y)
-        self.speed = 1
 
     def move(self, speed):
         self.x = self.x + speed
@@ -155,25 +238,6 @@ class Black_hole(pygame.sprite.Sprite):
         screen.blit(self.image, self.rect)
 
 
-class Star(pygame.sprite.Sprite):
-    def __init__(self, x, y, radius, color, speed):
-        pygame.sprite.Sprite.__init__(self)
-        self.x = x
-        self.y = y
-        self.radius = radius
-        self.color = color
-        self.speed = speed
-
-    def move(self, speed):
-        self.x = self.x + speed
-
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, (self.x, self.y), self.radius)
-
-
-
-
-
 #######################################################################
 # functions
 #######################################################################
@@ -182,154 +246,218 @@ class Star(pygame.sprite.Sprite):
 # This writes the calendars' text onto the screen.
 # Instead of a string, it uses a list of strings as its input
 # along with it's top-left (x, y) location.
-def draw_text(text_list, x, y):
-        my_font = pygame.font.SysFont(calendar_font, calendar_font_size)
+def draw_text(screen, text_list, x, y):
+        font_size = layout.font_size(calendar_font_size)
         for i in range(0, len(text_list)):
-            line = my_font.render(text_list[i], True, WHITE)
-            SCREEN.blit(line, (x, int(y + i*calendar_font_size * (1.33))))
-
-################################################################################################################################################################################
-
-# this writes the current mode onto the screen
-def draw_mode():
-        my_font = pygame.font.SysFont(mode_font, mode_font_size)
-        text_surface = my_font.render("YOU ARE ON " + mode, False, WHITE)
-        SCREEN.blit(text_surface, (25, 25))
+            line = text_cache.render(text_list[i], calendar_font, font_size, WHITE, True)
+            screen.blit(line, layout.point(x, int(y + i*calendar_font_size * (1.33))))
 
 def r(object_A, object_B):          # this is r = distance of Object B from Object A (so A is on the left and B on the right => returns positive int)
     return object_B.x - object_A.x
 
 ################################################################################################################################################################################
 
-# this writes the distance of the ship from the event horizon on the screen
-def draw_distance(distance, unit, place):
-        my_font = pygame.font.SysFont(mode_font, mode_font_size)
-        text_surface = my_font.render("THE SHIP IS " + str(distance) + " " + unit + " FROM " + place, True, WHITE)
-        y = int(mode_font_size * 2)
-        SCREEN.blit(text_surface, (25, y))
-
-################################################################################################################################################################################
-
-# this create the calendar (as a list of strings where each string is a row of the calendar)
-def create_calendar(input_date, name_of_calendar, age):
-
-    current_calendar = calendar.month(input_date.year, input_date.month)  # a calendar of the current month (as single string)
-    today = int(input_date.day)
-    split = current_calendar.split("\n")
-    done = False
-
-    if today < 10:
-        for i in range(2, len(split)):
-            if done == True:
-                break
-            elif done == False:
-                for j in range(0, len(split[i])):
-                    if split[i][j] == str(today):
-                        string = split[i]
-                        split[i] = string[:j] + " " + string[j+1:]
-                        done = True
-                        break
-    elif today >= 10:
-        for i in range(2, len(split)):
-            if done == True:
-                break
-            elif done == False:
-                for j in range(0, len(split[i])):
-                    if split[i][j : j+2] == str(today):
-                        string = split[i]
-                        split[i] = string[:j] + "  " + string[j+2:]
-                        done = True
-                        break
+# this draws a calendar at x along with the black box behind it and, if it's highlighted, the border around it (this highlights the current mode's calendar)
+# (surface is the calendar and its box rendered ahead of time, see hud.py)
+def draw_calendar(screen, calendar_lines, x, highlighted, surface=None):
+    calendar_height = round(1.33 * calendar_font_size * len(calendar_lines))    # this sets the height for the black box behind the calendar
+    if surface is not None:
+        screen.blit(surface, layout.point(x, 250))
     else:
-        None
-
-    if split[-1] == "":                                                     # remove the last row if it's blank
-        del split[-1]
+        pygame.draw.rect(screen, background_color, layout.rect((x, 250, 210, calendar_height)))  # draw the background rectangle for the calendar (so it's always readable)
+        draw_text(screen, calendar_lines, x + 5, 250)                               # draw the calendar
 
-    last_row1 = " Today is: " + MONTH[input_date.month] + " " + str(today)
-    split.append(last_row1)                                                 # add today's date to the last row
-    last_row2 = "      Age: " + str(age)
-    split.append(last_row2)                                                 # add the current age of the person to the last row
-    split.insert(0, name_of_calendar)                                       # insert the calendar name at the top of the calendar
-    return split                                                            # returns a list of strings that makes the current month's calendar
+    if highlighted:
+        width = 2
+        pygame.draw.rect(screen, YELLOW, layout.rect((x - width, 250 - width, 210 + width + 1, calendar_height + width + 1)), layout.length(width))  # draw the border around the calendar
 
 ################################################################################################################################################################################
 
-def draw_calendars():
-
-    # draw the calendar for Earth
-    earth_calendar_height = round(1.33 * calendar_font_size * len(earth_calendar))      # this sets the height for the black box behind the calendar
-    pygame.draw.rect(SCREEN, background_color, (30, 250, 210, earth_calendar_height))   # draw the background rectangle for the calendar (so it's always readable)
-    draw_text(earth_calendar, 35, 250)                                                  # draw the calendar
-
-    # draw the calendar for the ship
-    ship_calendar_height = round(1.33 * calendar_font_size * len(ship_calendar))                        # this sets the height for the black box behind the calendar
-    pygame.draw.rect(SCREEN, background_color, (WINDOW_WIDTH - 255, 250, 210, ship_calendar_height))    # draw the background rectangle for the calendar (so it's always readable)
-    draw_text(ship_calendar, WINDOW_WIDTH - 250, 250)                                                   # draw the calendar
-
-    # draw the border around the appropriate calendar (this highlights the current mode's calendar)
-    width = 2
-    # set the variables for the appropriate calendar
-    if mode == "EARTH":
-        calendar_x, calendar_y, calendar_width, calendar_height =  30 - width, 250 - width, 210 + width + 1, earth_calendar_height + width + 1
-    elif mode == "THE SPACESHIP":
-        calendar_x, calendar_y, calendar_width, calendar_height =  WINDOW_WIDTH - 255 - width, 250 - width, 210 + width+1, ship_calendar_height + width+1
-    else:
-        None
-    pygame.draw.rect(SCREEN, YELLOW, (calendar_x, calendar_y, calendar_width, calendar_height), width)  # draw the border around the appropriate calendar
-
-################################################################################################################################################################################
+# The following make the items the screen is drawn from (see dirty_render.py).
+# Each item has a name, the rectangle it covers on the screen, a key that changes whenever it looks different and a function that draws it.
+# The items are placed in the logical window and their rectangles are where the layout puts them on the screen.
+
+# this draws the sprites in shown that are on the screen with one Surface.blits() (a single batched blit in the order of their layers)
+# sprites that are off the screen (like Earth once the ship has flown away) are left out before anything is drawn
+def sprites_item(name, all_sprites, shown):
+    visible = [sprite for sprite in all_sprites if sprite in shown and sprite.image is not None and sprite.rect.colliderect(SCREEN_RECT)]   # (all_sprites is already in the order of the layers)
+    rect = pygame.Rect(visible[0].rect).unionall([sprite.rect for sprite in visible[1:]]) if visible else pygame.Rect(0, 0, 0, 0)
+    key = tuple((id(sprite.image), tuple(sprite.rect)) for sprite in visible)
+    def draw(screen):
+        screen.blits([(layout.surface(sprite.image), layout.point(*sprite.rect.topleft)) for sprite in visible])
+    return SceneItem(name, layout.rect(rect), key, draw)
+
+def star_layer_item(name, layer):
+    return SceneItem(name, layout.screen_rect(), layer.offset, lambda screen: layer.draw(screen, layout), "star drawing")
+
+def calendar_item(name, calendar_lines, x, highlighted, surface=None):
+    calendar_height = round(1.33 * calendar_font_size * len(calendar_lines))
+    rect = layout.rect((x - 2, 248, 213, calendar_height + 3))                  # this includes the border
+    return SceneItem(name, rect, (calendar_lines, highlighted), lambda screen: draw_calendar(screen, calendar_lines, x, highlighted, surface), "hud drawing")
+
+# this is a line of the mode's font at (x, y) (hud is the HudPreparer it may already be rendered by, or None)
+def text_item(name, text, antialias, x, y, hud=None):
+    font_size = layout.font_size(mode_font_size)
+    text_surface = None
+    if hud is not None:
+        text_surface = hud.get(text_key(text, mode_font, font_size, WHITE, antialias))
+    if text_surface is None:
+        text_surface = text_cache.render(text, mode_font, font_size, WHITE, antialias)
+    position = layout.point(x, y)
+    return SceneItem(name, text_surface.get_rect(topleft=position), text, lambda screen: screen.blit(text_surface, position), "hud drawing")
 
-# This is the number of milliseconds in the program that represents one "real" day in the calendar.
-# In the simulation, we could have experienced time going at time's normal rate, but then you'd have to wait an entire day on your calendar
-# to see one day move on the simulation's calendar. As such, we are shortening the simulation's experienced day to be faster than an actual experienced day.
-# Generally, I will set it up to be about one real second = "one day you experience" in the simulation.
-MILLISECONDS_PER_DAY = 1000
-
-# The following amounts to gamma in the time contraction formula.
-# This is used when you are on Earth watching a ship go closer to a mass.
-# Your clock will stay the same but their clock will seem to slow down (from your perspective).
-# This essentially provides the amount of slow-down given the ship's distance from the massive object.
-# The closer the ship is to the mass (ie shorter the distance), the higher the returned integer.
-# R is the distance from the ship to the event horizon and D is the distance from the black hole's "mode" to the event horizon
-def SLOWER_DAY(R, D):
-    factor = (math.sqrt(1 - ((D - R)/D)**2)) ** 2
-    contract = round(MILLISECONDS_PER_DAY / factor)
-    return contract
-
-
-# The following amounts to gamma in the time dilation formula.
-# This is used when you are on a ship (going towards a mass) watching Earth.
-# Your clock will stay the same but Earth's clock will seem to speed up (from your perspective).
-# This essentially provides the amount of speed-up given the ship's distance from the massive object.
-# The closer the ship is to the mass (ie shorter the distance), the lower the returned integer.
-# R is the distance from the ship to the event horizon and D is the distance from the black hole's "mode" to the event horizon
-def FASTER_DAY(R, D):
-    factor = (math.sqrt(1 - ((D - R)/D)**2)) ** 2
-    dilate = round(MILLISECONDS_PER_DAY * factor)
-    return dilate
+# this writes the current mode onto the screen
+def mode_line(mode):
+    return "YOU ARE ON " + mode
+
+def mode_item(mode, hud=None):
+    return text_item("mode", mode_line(mode), False, 25, 25, hud)
+
+# This is what the distance line says with the ship at location facing "RIGHT" or "LEFT": (distance, unit, place),
+# or None in the event horizon. The distance is to the event horizon when the ship faces it and to Earth when it faces Earth.
+def distance_parts(location, facing):
+    if location < 0:                                # near Earth
+        if facing == "RIGHT":
+            return (1000, "LIGHTYEARS", "THE EVENT HORIZON")
+        return (0, "LIGHTYEARS", "EARTH")
+    if location < bh_location:                      # interstellar
+        if facing == "RIGHT":
+            return (bh_location - location, "LIGHTYEARS", "THE EVENT HORIZON")
+        return (location, "LIGHTYEARS", "EARTH")
+    r = eh_location - location                      # near the black hole
+    if r <= 0:
+        return None
+    if facing == "RIGHT":
+        return (r, "KM", "THE EVENT HORIZON")
+    return (1000, "LIGHTYEARS", "EARTH")
 
+# this writes the distance of the ship from the event horizon on the screen
+def distance_line(distance, unit, place):
+    return "THE SHIP IS " + str(distance) + " " + unit + " FROM " + place
+
+def distance_item(distance, unit, place, hud=None):
+    return text_item("distance", distance_line(distance, unit, place), True, 25, int(mode_font_size * 2), hud)
+
+# This is what the HUD expects to show next, for HudPreparer.want(): the calendars and lines shown now first,
+# then the calendars' next dates and the distance lines a few steps either way of the ship.
+def hud_keys(engine, state):
+    font_size = layout.font_size(mode_font_size)
+    def mode_key(mode):
+        return text_key(mode_line(mode), mode_font, font_size, WHITE, False)
+    def distance_key(location, facing):
+        distance = distance_parts(location, facing)
+        if distance is None:
+            return None
+        return text_key(distance_line(*distance), mode_font, font_size, WHITE, True)
+
+    (earth_upcoming, ship_upcoming) = engine.upcoming_calendars(STEP_TIME, hud_lookahead)
+    earth_calendars = [(state.earth_date, state.earth_age)] + earth_upcoming
+    ship_calendars = [(state.ship_date, state.ship_age)] + ship_upcoming
+
+    keys = [mode_key(state.mode), distance_key(state.ship_location, state.facing)]
+    for i in range(0, hud_lookahead + 1):
+        keys.append(calendar_key(earth_calendars[i][0], "  Earth's calendar", earth_calendars[i][1], layout.scale))
+        keys.append(calendar_key(ship_calendars[i][0], "Spaceship's calendar", ship_calendars[i][1], layout.scale))
+    keys = keys + [mode_key(mode) for mode in MODES]
+    for steps in range(1, hud_lookahead + 1):
+        for location in (state.ship_location + steps * ship_speed, state.ship_location - steps * ship_speed):
+            keys.append(distance_key(location, "RIGHT"))
+            keys.append(distance_key(location, "LEFT"))
+    return [key for key in dict.fromkeys(keys) if key is not None]     # (without the duplicates, in order)
+
+# this shows the fleet in the bottom left corner: how many ships are in each cell of a location (across) by lag behind Earth (up) grid
+# (the brighter a cell, the more ships in it) and the spread of the fleet's calendars next to it
+FLEET_HEATMAP_BINS = (100, 24)
+FLEET_HEATMAP_SIZE = (400, 144)
+
+def fleet_heatmap_surface(counts):
+    level = numpy.log1p(counts) / numpy.log1p(max(counts.max(), 1))    # 0 for an empty cell, 1 for the fullest one
+    pixels = numpy.zeros(counts.shape + (3,), dtype=numpy.uint8)
+    pixels[..., 0] = 255 * level
+    pixels[..., 1] = 255 * level ** 2
+    pixels[..., 2] = 80 * (counts > 0) + 100 * (1 - level) * (counts > 0)
+    surface = pygame.surfarray.make_surface(pixels[:, ::-1])                # the most lag at the top
+    return pygame.transform.scale(surface, (layout.length(FLEET_HEATMAP_SIZE[0]), layout.length(FLEET_HEATMAP_SIZE[1])))
+
+def fleet_lines(summary):
+    return ("Fleet of %d ships (%d stuck)" % (summary["ships"], summary["stuck"]),
+            "Earth:    " + summary["earth_date"].isoformat(),
+            "Latest:   " + summary["latest_date"].isoformat(),
+            "Median:   " + summary["median_date"].isoformat(),
+            "Earliest: " + summary["earliest_date"].isoformat(),
+            "Youngest: " + str(summary["youngest_age"]),
+            "Max lag:  " + str(summary["max_lag"]) + " days")
+
+def fleet_item(heatmap, lines, key):
+    x = 25
+    y = WINDOW_HEIGHT - FLEET_HEATMAP_SIZE[1] - 20
+    rect = layout.rect((x, y, FLEET_HEATMAP_SIZE[0] + 320, FLEET_HEATMAP_SIZE[1]))
+    def draw(screen):
+        pygame.draw.rect(screen, background_color, rect)
+        screen.blit(heatmap, layout.point(x, y))
+        pygame.draw.rect(screen, GREY, layout.rect((x, y, FLEET_HEATMAP_SIZE[0], FLEET_HEATMAP_SIZE[1])), 1)
+        draw_text(screen, lines, x + FLEET_HEATMAP_SIZE[0] + 15, y)
+    return SceneItem("fleet", rect, key, draw, "hud drawing")
+
+# this shows the profiler's numbers in the top right corner (in the calendars' font)
+def profiler_item(lines):
+    line_height = int(calendar_font_size * 1.33)
+    x = WINDOW_WIDTH - 330
+    rect = layout.rect((x - 5, 20, 310, line_height * len(lines) + 10))
+    def draw(screen):
+        pygame.draw.rect(screen, background_color, rect)
+        draw_text(screen, lines, x, 25)
+    return SceneItem("profiler", rect, lines, draw, "hud drawing")
 
 ################################################################################################################################################################################
 
+# this reads a script of key presses (see --script) into a dictionary of frame number -> list of events to post on that frame
+def load_script(path):
+    with open(path) as f:
+        script = json.load(f)
+    events = {}
+    for (frame, event_type, key) in script["events"]:
+        event = pygame.event.Event(getattr(pygame, event_type), key=getattr(pygame, "K_" + key))
+        events.setdefault(frame, []).append(event)
+    return events
+
+# this returns the peak memory of the simulator in kilobytes (or None where the resource module isn't available)
+def peak_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+# this writes what --report asks for: the frame rate, the frame time percentiles, the startup time and the peak memory
+def write_report(path, state, frame_times, startup, first_frame_time, wall_ms, hud=None, export=None, allocations=None, telemetry=None):
+    frame_times = numpy.array(frame_times)
+    report = {
+        "frames": len(frame_times),
+        "wall_ms": wall_ms,
+        "fps": len(frame_times) / (wall_ms / 1000) if wall_ms > 0 else 0,
+        "frame_ms": {},
+        "startup_ms": startup.total(),
+        "startup_phases": dict(startup.phases),
+        "first_frame_time": first_frame_time,
+        "peak_rss_kb": peak_rss(),
+        "text_cache_hit_rate": text_cache.hit_rate(),
+        "hud_ready_rate": hud.hit_rate() if hud is not None else None,     # how often the HUD's surfaces were rendered ahead of time
+        "export": export,
+        "allocations": allocations,
+        "telemetry": telemetry,
+        "ship_location": state.ship_location,
+        "earth_date": state.earth_date.isoformat(),
+        "ship_date": state.ship_date.isoformat(),
+    }
+    if len(frame_times) > 0:
+        for p in (50, 90, 99):
+            report["frame_ms"]["p" + str(p)] = float(numpy.percentile(frame_times, p))
+        report["frame_ms"]["max"] = float(frame_times.max())
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
 
-##########################################################
-# create and initialize simulation objects and variables #
-##########################################################
-
-
-x = WINDOW_WIDTH//2     # set the x-value for Earth's location on screen
-y = WINDOW_HEIGHT//2    # set the y-value for Earth's location on screen
-earth = Earth(x, y, 0)  # creating the Earth object (as a sprite)
-all_sprites.add(earth)  # add the sprite to the Sprite Group
-
-x = WINDOW_WIDTH                                        # set the x-value for the black hole's location on screen
-y = 10                                                  # set the y-value for the black hole's location on screen
-black_hole = Black_hole(x, y, bh_location, eh_location) # creating the black hole object (as a sprite)
-all_sprites.add(black_hole)                             # add the sprite to the Sprite Group
-
-ship = Ship(WINDOW_WIDTH//2, 350, ship_location, 1, "RIGHT") # creating the spaceship object (as a sprite)
-all_sprites.add(ship)                   # adding the sprite to the Sprite Group
+################################################################################################################################################################################
 
 
 # The following will make the stars in the background.
@@ -337,409 +465,497 @@ all_sprites.add(ship)                   # adding the sprite to the Sprite Group
 # While most starts will be white, a few will be grey, yellow, or light blue (and of varying sizes).
 # Just make all the specialty stars a small number compared to the mod.
 # The more white stars you want, just make the mod a higher number.
+#
+# Each layer keeps its stars in arrays and is drawn onto surfaces that are blitted to the screen (see starfield.py),
+# so the number of stars doesn't change how long it takes to draw or move a layer.
+# The moving layers are made one chunk at a time as they scroll onto the screen (from the seed, so the sky is the same every time
+# for the same seed) and only a few chunks are kept, so the stars never run out and the memory stays the same on any flight.
 
 stars_per_layer = 200
 mod = 10
-
-background_stars_0 = []
-for i in range(0, stars_per_layer // 4):
-    x = random.randint(0, WINDOW_WIDTH)
-    y = random.randint(0 , WINDOW_HEIGHT)
-    star = Star(x, y, 1, WHITE, 0)
-    background_stars_0.append(star)
-
-
-background_stars_1 = []
-for i in range(0, stars_per_layer // 3):
-    x = random.randint(WINDOW_WIDTH, WINDOW_WIDTH + (1000 * ship_speed))
-    y = random.randint(0 , WINDOW_HEIGHT)
-    if i % mod == 0:
-        color = LIGHT_BLUE
-        radius = 3
-    elif i % mod == 1:
-        color = GREY
-        radius = 2
-    elif i % mod <= 3:
-        color = YELLOW
-        radius = 1
+star_density = 1                # multiply the number of stars on every layer by this (more stars don't slow down the frame rate)
+chunk_star_layers = True        # set this to False to move and draw the stars themselves instead of pre-drawn chunks (they run out eventually)
+star_chunk_width = WINDOW_WIDTH # this is the width of each chunk of a moving layer
+star_chunks_cached = 4          # the most chunks each moving layer keeps (two are on the screen at a time)
+
+STAR_COLORS = [WHITE, LIGHT_BLUE, GREY, YELLOW]     # the star fields store an index into this list instead of a color
+
+# this makes a field of stars spread over the given width (every mod-th star is a specialty star unless colored is False)
+# the stars are placed with star_random (a NumPy generator, so the same seed always makes the same stars)
+def make_stars(star_random, count, width, speed, colored):
+    i = numpy.arange(count)
+    x = star_random.integers(0, width, count)
+    y = star_random.integers(0, WINDOW_HEIGHT + 1, count)
+    color_index = numpy.zeros(count, dtype=numpy.uint8)     # WHITE
+    radius = numpy.ones(count, dtype=numpy.uint8)
+    if colored == True:
+        color_index[i % mod <= 3] = 3                       # YELLOW
+        radius[i % mod == 1] = 2
+        color_index[i % mod == 1] = 2                       # GREY
+        radius[i % mod == 0] = 3
+        color_index[i % mod == 0] = 1                       # LIGHT_BLUE
+    return StarField(x, y, radius, color_index, numpy.full(count, speed), STAR_COLORS)
+
+# this makes moving layer number layer with count stars for every span pixels it used to be spread over
+def make_star_layer(star_random, seed, layer, count, span, speed):
+    count = count * star_density
+    if chunk_star_layers:
+        chunk_count = round(count * star_chunk_width / span)    # keep the same density of stars in every chunk
+        make_field = lambda chunk_random: make_stars(chunk_random, chunk_count, star_chunk_width, speed, True)
+        return ChunkedStarLayer(make_field, star_chunk_width, WINDOW_HEIGHT, WINDOW_WIDTH, speed, background_color, seed, layer, star_chunks_cached)
     else:
-        color = WHITE
-        radius = 1
-    star = Star(x, y, radius, color, ship_speed)
-    background_stars_1.append(star)
-
-background_stars_2 = []
-for i in range(0, stars_per_layer // 2):
-    x = random.randint(WINDOW_WIDTH, WINDOW_WIDTH + (1000 * SPEED))
-    y = random.randint(0 , WINDOW_HEIGHT)
-    if i % mod == 0:
-        color = LIGHT_BLUE
-        radius = 3
-    elif i % mod == 1:
-        color = GREY
-        radius = 2
-    elif i % mod <= 3:
-        color = YELLOW
-        radius = 1
-    else:
-        color = WHITE
-        radius = 1
-    star = Star(x, y, radius, color, SPEED)
-    background_stars_2.append(star)
-
-background_stars_3 = []
-for i in range(0, stars_per_layer):
-    x = random.randint(WINDOW_WIDTH, WINDOW_WIDTH + (1000 * SPEED * 2))
-    y = random.randint(0 , WINDOW_HEIGHT)
-    if i % mod == 0:
-        color = LIGHT_BLUE
-        radius = 3
-    elif i % mod == 1:
-        color = GREY
-        radius = 2
-    elif i % mod <= 3:
-        color = YELLOW
-        radius = 1
-    else:
-        color = WHITE
-        radius = 1
-    star = Star(x, y, radius, color, SPEED * 2)
-    background_stars_3.append(star)
-
-
-################
-# main program #
-################
-
-
-# this initiates the mode of play (between "staying on Earth" or "going on the ship")
-k = 0
-mode = MODES[k]
-
-# initiate the ages of the two perspectives
-earth_age = 20
-earth_day_counter = 0
-
-ship_age = 20
-ship_day_counter = 0
-
-# initialize the calendars
-earth_calendar = create_calendar(earth_date, "  Earth's calendar", earth_age)
-ship_calendar = create_calendar(ship_date, "Spaceship's calendar", ship_age)
-
-# this begins the clock that is used reference the calendar speeds
-mainClock = pygame.time.Clock()
-
-earth_timer = 0     # initialize Earth's timer (milliseconds)
-ship_timer = 0      # initialize the spaceship's timer (milliseconds)
-
-earth_t0 = pygame.time.get_ticks()  # get the current time for Earth
-ship_t0 = pygame.time.get_ticks()   # get the current time for the ship
-
-travel_modes = ["near Earth", "interstellar", "near black hole"]
-current_travel_mode = travel_modes[0]
-
-speed = 0   # this initializes the speed of everything on the screen
-
-R = black_hole.location - ship.location
-
-TAB_down = False
-
-
-#################
-# the main loop #
-#################
+        return StarLayer(make_stars(star_random, count, span, speed, True), None, WINDOW_HEIGHT, WINDOW_WIDTH, speed, background_color)
 
-running = True
+# this makes the stationary layer and the list of moving layers from the seed
+def make_star_layers(seed):
+    star_random = numpy.random.default_rng(seed)
 
-while running:
+    # the stationary stars fill the window and never move
+    background_stars_0 = StarLayer(make_stars(star_random, stars_per_layer // 4 * star_density, WINDOW_WIDTH, 0, False), WINDOW_WIDTH, WINDOW_HEIGHT, 0, 0, background_color)
 
-    mainClock.tick(60)  # set the program's clock to 60 Frames Per Second
-
-    # Check to see if the user terminated the program.
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-            break
-        else:
-            None
-
-###############################
-# update timers and calendars #
-###############################
-
-    # update timers
-    t1 = pygame.time.get_ticks()   # get the current time
-    earth_timer = t1 - earth_t0
-    ship_timer = t1 - ship_t0
-
-    # calculate the current date for each location (on Earth or on the spaceship) and for each situation (time proper vs dilated/contracted time)
-    if mode == "EARTH":
-
-        # update Earth's calendar as necessary
-        if earth_timer >= MILLISECONDS_PER_DAY:                                             # if Earth's timer has exceeded enough for the calendar to move to the next day...
-            earth_date = earth_date + timedelta(days=1)                                     # set Earth's date for the next day
-            earth_calendar = create_calendar(earth_date, "  Earth's calendar", earth_age)   # create Earth's new calendae
-            earth_timer = 0                                                                 # start over Earth's timer
-            earth_day_counter = earth_day_counter + 1
-            earth_t0 = pygame.time.get_ticks()
-        else:
-            None
-
-        # update the spaceship's calendar as necessary
-        # decide which length of a day to use (based on distance from even horizon -- this is the mode of travel)
-        if current_travel_mode == "near black hole":
-            radius = black_hole.event_horizon - ship.location
-            DISTANCE = black_hole.event_horizon - black_hole.location
-            ship_length_of_day = SLOWER_DAY(radius, DISTANCE)
-        else:
-            ship_length_of_day = MILLISECONDS_PER_DAY
-
-        if ship_timer >= ship_length_of_day:                                                # if the spaceship's timer has exceeded enough for the calendar to move to the next day...
-            ship_date = ship_date + timedelta(days=1)                                       # set the spaceship's date for the next day
-            ship_calendar = create_calendar(ship_date, "Spaceship's calendar", ship_age)    # create the spaceship's new calendae
-            ship_timer = 0                                                                  # start over the spaceship's timer
-            ship_day_counter = ship_day_counter + 1
-            ship_t0 = pygame.time.get_ticks()
-        else:
-            None
+    # the moving stars start just off the right side of the window and scroll in as the ship flies away from Earth
+    background_stars_1 = make_star_layer(star_random, seed, 1, stars_per_layer // 3, 1000 * ship_speed, ship_speed)
+    background_stars_2 = make_star_layer(star_random, seed, 2, stars_per_layer // 2, 1000 * SPEED, SPEED)
+    background_stars_3 = make_star_layer(star_random, seed, 3, stars_per_layer, 1000 * SPEED * 2, SPEED * 2)
+    return (background_stars_0, [background_stars_1, background_stars_2, background_stars_3])
 
 
-    elif mode == "THE SPACESHIP":
+# near the black hole the farther layers slow down (each layer's speed is divided by its number here)
+near_black_hole_slowdown = [1, 2, 5]
 
-        # update Earth's calendar as necessary
-        # decide which length of a day to use (based on distance from even horizon)
-        if current_travel_mode == "near black hole":
-            radius = black_hole.event_horizon - ship.location
-            DISTANCE = black_hole.event_horizon - black_hole.location
-            earth_length_of_day = FASTER_DAY(radius, DISTANCE)
+# this moves every moving layer by the given number of steps (a positive number of steps moves the stars to the left)
+def move_stars(moving_star_layers, steps, travel_mode):
+    for i in range(0, len(moving_star_layers)):
+        if travel_mode == "near black hole":
+            moving_star_layers[i].scroll(steps, near_black_hole_slowdown[i])
         else:
-            earth_length_of_day = MILLISECONDS_PER_DAY
-
-        if earth_timer >= earth_length_of_day:                                      # if Earth's timer has exceeded enough for the calendar to move to the next day...
-            radius = black_hole.event_horizon - ship.location
-            if radius > 500:
-                jump_days = 1
-            elif radius > 250:
-                jump_days = 2
-            elif radius > 125:
-                jump_days = 4
-            elif radius > 62:
-                jump_days = 8
-            elif radius > 62:
-                jump_days = 8
-            elif radius > 30:
-                jump_days = 16
-            elif radius > 15:
-                jump_days = 32
-            elif radius > 8:
-                jump_days = 64
-            elif radius > 4:
-                jump_days = 128
-            elif radius > 2:
-                jump_days = 256
-            elif radius > 1:
-                jump_days = 512
-            earth_date = earth_date + timedelta(days=jump_days)                         # set Earth's date for the next day
-            earth_calendar = create_calendar(earth_date, "  Earth's calendar", earth_age)  # create Earth's new calendae
-            earth_day_counter = earth_day_counter + jump_days
-            earth_timer = 0                                                         # start over Earth's timer
-            earth_t0 = pygame.time.get_ticks()
-        else:
-            None
-
-        # update the spaceship's calendar as necessary
-        if ship_timer >= MILLISECONDS_PER_DAY:                                      # if the spaceship's timer has exceeded enough for the calendar to move to the next day...
-            ship_date = ship_date + timedelta(days=1)                               # set the spaceship's date for the next day
-            ship_calendar = create_calendar(ship_date, "Spaceship's calendar", ship_age)  # create the spaceship's new calendae
-            ship_day_counter = ship_day_counter + 1
-            ship_timer = 0                                                          # start over the spaceship's timer
-            ship_t0 = pygame.time.get_ticks()
-        else:
-            None
-    else:
-        None
+            moving_star_layers[i].scroll(steps)
 
-    while earth_day_counter > 365:
-        earth_age = earth_age + 1
-        earth_day_counter = earth_day_counter - 365
 
-    if ship_day_counter > 365:
-        ship_age = ship_age + 1
-        ship_day_counter = 0
-    else:
-        None
 
-########################
-# player pressing keys #
-########################
+################
+# main program #
+################
 
-    # if a player RELEASES a key
-    if event.type == pygame.KEYUP:
-        if event.key == pygame.K_TAB:
-            TAB_down = False
-    else:
-        None
-
-
-    # if a player PRESSES a key
-    if event.type == pygame.KEYDOWN:
-        # user hits the TAB key (to change perspective modes)
-        if event.key == pygame.K_TAB:
-            if TAB_down == False:
-                k = (k + 1) % len(MODES)
-                mode = MODES[k]
-                TAB_down = True
-            else:
-                None
-
-        # user hits the RIGHT arrow key
-        if event.key == pygame.K_RIGHT:
-            ship.facing = "RIGHT"
-            ship.image = pygame.image.load('ship_right.png')
-            ship.image.set_colorkey(background_color)
-
-            if current_travel_mode == "near Earth":
-                earth.move(-SPEED)
-                if earth.rect.right <= 0:
-                    ship.location = 0
-            elif current_travel_mode == "interstellar":
-                for i in range(0, len(background_stars_1)):   # move the stars
-                    background_stars_1[i].x = background_stars_1[i].x - background_stars_1[i].speed
-                for i in range(0, len(background_stars_2)):   # move the stars
-                    background_stars_2[i].x = background_stars_2[i].x - background_stars_2[i].speed
-                for i in range(0, len(background_stars_3)):   # move the stars
-                    background_stars_3[i].x = background_stars_3[i].x - background_stars_3[i].speed
-                ship.location = ship.location + ship.speed
-            elif current_travel_mode == "near black hole":
-                for i in range(0, len(background_stars_1)):   # move the stars
-                    background_stars_1[i].x = background_stars_1[i].x - background_stars_1[i].speed
-                for i in range(0, len(background_stars_2)):   # move the stars
-                    background_stars_2[i].x = background_stars_2[i].x - (background_stars_2[i].speed // 2)
-                for i in range(0, len(background_stars_3)):   # move the stars
-                    background_stars_3[i].x = background_stars_3[i].x - (background_stars_3[i].speed // 5)
-                ship.location = ship.location + ship.speed
-                r = black_hole.event_horizon - ship.location
-                if r % 3 == 0:
-                    black_hole.speed = 2
-                else:
-                    black_hole.speed = 1
-                black_hole.move(-black_hole.speed)
-            else:
-                None
-            
-        # user hits the LEFT arrow key
-        if event.key == pygame.K_LEFT:
-            ship.facing = "LEFT"
-            ship.image = pygame.image.load('ship_left.png')
-            ship.image.set_colorkey(background_color)
-
-            if current_travel_mode == "near Earth":
-                if earth.rect.right >= WINDOW_WIDTH:
-                    None
-                else:
-                    earth.move(SPEED)
-                    
-            elif current_travel_mode == "interstellar":
-                for i in range(0, len(background_stars_1)):   # move the stars
-                    background_stars_1[i].x = background_stars_1[i].x + background_stars_1[i].speed
-                for i in range(0, len(background_stars_2)):   # move the stars
-                    background_stars_2[i].x = background_stars_2[i].x + background_stars_2[i].speed
-                for i in range(0, len(background_stars_3)):   # move the stars
-                    background_stars_3[i].x = background_stars_3[i].x + background_stars_3[i].speed
-                
-                if ship.location < 0:
-                    None
-                else:
-                    ship.location = ship.location - ship.speed
-                
-            elif current_travel_mode == "near black hole":
-                for i in range(0, len(background_stars_1)):   # move the stars
-                    background_stars_1[i].x = background_stars_1[i].x + background_stars_1[i].speed
-                for i in range(0, len(background_stars_2)):   # move the stars
-                    background_stars_2[i].x = background_stars_2[i].x + (background_stars_2[i].speed // 2)
-                for i in range(0, len(background_stars_3)):   # move the stars
-                    background_stars_3[i].x = background_stars_3[i].x + (background_stars_3[i].speed // 5)
-                ship.location = ship.location - ship.speed
-                black_hole.move(black_hole.speed)
-            else:
-                None
 
+# this runs the simulator (started is the perf_counter() time the program started at, so the startup profile includes the imports)
+def main(argv=None, started=None):
+    startup = StartupProfile(started)
+    if started is not None:
+        startup.lap("imports")
+    args = parse_args(argv)
+
+    render_fps = args.fps
+    dirty_rects = dirty_rect_rendering or args.dirty_rects
+    profile_path = profile_csv
+    if args.profile_csv is not None:
+        profile_path = args.profile_csv
+
+    # a replay starts on the same date with the same stars and gravity model as its recording
+    replay_log = None
+    model = args.model
+    if args.replay is not None:
+        replay_log = InputLog(args.replay)
+        seed = replay_log.seed
+        start_date = replay_log.start_date
+        model = replay_log.model
+        if args.max_speed:
+            render_fps = 0
     else:
-        None
-
-
-#########################################
-# draw everything and update the screen #
-#########################################
-
-    SCREEN.fill(background_color)               # erase screen
-
-    # determine the current travel mode
-    if ship.location < 0:
-        current_travel_mode = "near Earth"
-    elif ship.location < black_hole.location:
-        current_travel_mode = "interstellar"
+        seed = args.seed if args.seed is not None else random.randrange(2**32)
+        start_date = date.today()
+    age = start_age
+
+    # a resumed flight starts on the date and at the age with the stars and the gravity model it was saved with (see checkpoint.py)
+    resumed = None
+    if args.resume and os.path.exists(args.checkpoint):
+        resumed = Checkpoint(args.checkpoint)
+        seed = resumed.seed
+        start_date = resumed.start_date
+        age = resumed.start_age
+        model = resumed.model
+
+    # an export renders offscreen (unless a video driver was picked) as fast as the frames can be written, one frame per step
+    exporting = args.export is not None and not args.export_live
+    if exporting:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        render_fps = 0
+
+    startup.lap("arguments")
+
+    # set up pygame (only the parts the simulator uses, which is quicker than pygame.init())
+    pygame.display.init()
+    pygame.font.init()
+    all_sprites = pygame.sprite.LayeredUpdates()     # every sprite (kept in the order they're drawn in)
+    startup.lap("pygame init")
+
+    # define surface
+    screen = pygame.display.set_mode(args.window_size or (WINDOW_WIDTH, WINDOW_HEIGHT), pygame.RESIZABLE)
+    pygame.display.set_caption('Simulation')
+    layout.resize(screen.get_size())
+    capture = None
+    if args.export is not None:
+        capture = FrameCapture(args.export, screen.get_size(), screen, args.export_format, args.export_workers, drop=args.export_live)
+    startup.lap("display")
+
+    # load every image once (this has to happen after the display is set up so the images can be converted to its pixel format)
+    assets = AssetManager(background_color)
+    assets.load_all(["ship_right", "ship_left", "earth"])     # the black hole is loaded after the first frame
+    if SHOW_ASSET_REPORT:
+        for line in assets.report():
+            print(line)
+    startup.lap("images")
+
+    ##########################################################
+    # create and initialize simulation objects and variables #
+    ##########################################################
+
+
+    x = WINDOW_WIDTH//2     # set the x-value for Earth's location on screen
+    y = WINDOW_HEIGHT//2    # set the y-value for Earth's location on screen
+    earth = Earth(x, y, 0, assets.image("earth"))  # creating the Earth object (as a sprite)
+    all_sprites.add(earth)  # add the sprite to the Sprite Group
+
+    x = WINDOW_WIDTH                                        # set the x-value for the black hole's location on screen
+    y = 10                                                  # set the y-value for the black hole's location on screen
+    black_hole = Black_hole(x, y, bh_location, eh_location, None) # creating the black hole object (as a sprite)
+    all_sprites.add(black_hole)                             # add the sprite to the Sprite Group
+
+    ship_images = {"RIGHT": assets.image("ship_right"), "LEFT": assets.image("ship_left")}
+    ship = Ship(WINDOW_WIDTH//2, 350, ship_location, 1, "RIGHT", ship_images) # creating the spaceship object (as a sprite)
+    all_sprites.add(ship)                   # adding the sprite to the Sprite Group
+
+    (background_stars_0, moving_star_layers) = make_star_layers(seed)
+    background_stars_0.prepare(layout)
+    startup.lap("stars")
+
+    # the first frame only needs Earth, the ship and the stationary stars, so the rest is done one piece per frame after it
+    # (and all at once if the ship leaves Earth before it's done)
+    deferred_startup = [lambda layer=layer: layer.prepare(layout) for layer in moving_star_layers]
+    deferred_startup.append(lambda: black_hole.set_image(assets.load("black hole")))
+    deferred_startup.append(lambda: layout.surface(black_hole.image))      # (scaled ahead of time too, if the window isn't the logical size)
+
+    # the simulation itself (the dates, ages, timers and the ship's location) lives in the engine (see engine.py)
+    engine = Engine(bh_location, eh_location, MILLISECONDS_PER_DAY, SPEED, ship_speed, WINDOW_WIDTH, earth.rect.width, start_date,
+                    age, model)
+    state = engine.state
+    if resumed is not None:
+        resumed.restore(engine, moving_star_layers)
+
+    # the fleet (see fleet.py) flies alongside the ship and is seen from Earth
+    fleet = None
+    if args.fleet > 0:
+        fleet = Fleet(args.fleet, bh_location, eh_location, MILLISECONDS_PER_DAY, start_date, age, seed=seed, model=model)    # (a resumed fleet starts again)
+    fleet_shown = None      # the simulation step the fleet's heatmap and text were made for
+
+    # initialize the calendars (they are only made again when their date or age changes)
+    earth_calendar = create_calendar(state.earth_date, "  Earth's calendar", state.earth_age)
+    ship_calendar = create_calendar(state.ship_date, "Spaceship's calendar", state.ship_age)
+    earth_calendar_shown = (state.earth_date, state.earth_age)
+    ship_calendar_shown = (state.ship_date, state.ship_age)
+
+    # the calendars and the HUD's text are rendered ahead of time on a background thread (see hud.py)
+    hud = None
+    if prepare_hud:
+        hud = HudPreparer(text_cache, calendar_font, calendar_font_size, WHITE, background_color)
+    hud_wanted = None       # the simulation step the HUD's next surfaces were asked for
+
+    # this begins the clock that is used reference the calendar speeds
+    # (the simulation runs one step for every STEP_TIME of the clock, which follows the real time unless it's a benchmark or a fast replay)
+    mainClock = pygame.time.Clock()
+    if args.lockstep or exporting or (replay_log is not None and args.max_speed):
+        clock = VirtualClock(SIMULATION_HZ)
     else:
-        current_travel_mode = "near black hole"
-
-    for i in range(0, len(background_stars_0)):   # draw the stationary stars
-        background_stars_0[i].draw(SCREEN)
-
-    if current_travel_mode == "near Earth":
-        earth.draw(SCREEN)
-        ship.draw(SCREEN)
-        if ship.facing == "RIGHT":
-            draw_distance(1000, "LIGHTYEARS", "THE EVENT HORIZON")
-        elif ship.facing == "LEFT":
-            draw_distance(0, "LIGHTYEARS", "EARTH")
+        clock = WallClock(MAX_FRAME_TIME)
+    steps_done = 0          # the number of simulation steps run so far
+    move_credit = 0         # fractions of a step the ship has earned while an arrow key is held down
+    if resumed is not None:
+        clock.now = resumed.now
+        steps_done = resumed.steps_done
+        move_credit = resumed.move_credit
+
+    keys_held = set()       # the arrow keys that are being held down right now
+    pressed = []            # the inputs from keys that were pressed since the last simulation step (so a quick tap still counts)
+
+    renderer = DirtyRenderer(screen, background_color)   # this is only used with --dirty-rects (or dirty_rect_rendering)
+
+    profiler = FrameProfiler(PROFILE_PHASES, profile_frames)
+    monitor = None
+    if args.allocations is not None:
+        monitor = AllocationMonitor(PROFILE_PHASES, args.allocation_every)
+        profiler.listener = monitor
+    show_profiler = False
+    profiler_lines = []     # the overlay's text (it's only worked out again every so often so it's readable and cheap)
+
+    # the scripted key presses and the frame times for --script, --frames and --report
+    script = {}
+    if args.script is not None:
+        script = load_script(args.script)
+    frame_number = 0
+    frame_times = []
+    first_frame_time = None
+
+    # the log of the events for --record
+    recorder = None
+    if args.record is not None:
+        recorder = InputRecorder(args.record, start_date, seed, model)
+
+    # the telemetry stream for --telemetry
+    telemetry = None
+    if args.telemetry is not None:
+        telemetry = TelemetryWriter(args.telemetry, TRAVEL_MODES, MODES)
+
+    # the checkpoints for --checkpoint
+    checkpoints = None
+    if args.checkpoint is not None:
+        checkpoints = CheckpointWriter(args.checkpoint)
+        next_checkpoint = time.perf_counter() + args.checkpoint_every
+    startup.lap("simulation setup")
+
+    #################
+    # the main loop #
+    #################
+
+    running = True
+    if monitor is not None:
+        monitor.start()         # (only the main loop is traced)
+    loop_started = time.perf_counter()
+
+    while running:
+
+        mainClock.tick(render_fps)  # limit the frame rate (0 means as fast as possible)
+        frame_start = time.perf_counter()
+        profiler.start_frame()
+
+        for scripted_event in script.get(frame_number, []):  # play back the script's key presses for this frame
+            pygame.event.post(scripted_event)
+
+        # handle every event that came in since the last frame (a replay takes its events from the log instead of the keyboard)
+        if replay_log is None:
+            frame_events = pygame.event.get()
         else:
-            None
-    elif current_travel_mode == "interstellar":
-
-        for i in range(0, len(background_stars_1)):   # draw the moving stars
-            background_stars_1[i].draw(SCREEN)
-        for i in range(0, len(background_stars_2)):   # draw the moving stars
-            background_stars_2[i].draw(SCREEN)
-        for i in range(0, len(background_stars_3)):   # draw the moving stars
-            background_stars_3[i].draw(SCREEN)
-
-        ship.draw(SCREEN)   # draw the ship
-
-        R = black_hole.location - ship.location
-        if ship.facing == "RIGHT":
-            draw_distance(R, "LIGHTYEARS", "THE EVENT HORIZON") # draw the distance to the event horizon
-        elif ship.facing == "LEFT":
-            draw_distance(ship.location, "LIGHTYEARS", "EARTH") # draw the distance to Earth
+            live_events = [event for event in pygame.event.get() if event.type in (pygame.QUIT, pygame.VIDEOEXPOSE, pygame.VIDEORESIZE)]
+            frame_events = replay_log.due(clock.now) + live_events
+            if replay_log.finished(clock.now):
+                running = False
+
+        for event in frame_events:
+            if recorder is not None:
+                recorder.record(clock.now, event)
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                renderer.invalidate()       # the window was uncovered so all of it has to be drawn again
+            elif event.type == pygame.VIDEORESIZE:
+                screen = pygame.display.get_surface()   # (pygame resizes the window's surface itself)
+                layout.resize(screen.get_size())        # the scaled images for a new scale are made as they're drawn
+                renderer.screen = screen
+                renderer.invalidate()
+                fleet_shown = None                      # the fleet's heatmap is made at the new size
+
+    ########################
+    # player pressing keys #
+    ########################
+
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_TAB:           # user hits the TAB key (to change perspective modes)
+                    pressed.append(TAB)
+                elif event.key == pygame.K_F3:          # user hits the F3 key (to show or hide the profiler)
+                    show_profiler = not show_profiler
+                elif event.key == pygame.K_RIGHT:       # user hits the RIGHT arrow key
+                    pressed.append(RIGHT)
+                    keys_held.add(RIGHT)
+                elif event.key == pygame.K_LEFT:        # user hits the LEFT arrow key
+                    pressed.append(LEFT)
+                    keys_held.add(LEFT)
+            elif event.type == pygame.KEYUP:
+                if event.key == pygame.K_RIGHT:
+                    keys_held.discard(RIGHT)
+                elif event.key == pygame.K_LEFT:
+                    keys_held.discard(LEFT)
+
+    ###############################
+    # update timers and calendars #
+    ###############################
+
+        profiler.lap("events")
+
+        # run as many fixed simulation steps as the time that went by calls for (so the simulation doesn't depend on the frame rate)
+        if replay_log is not None:
+            now = clock.advance(replay_log.next_time())     # don't run past the next event of the replay
         else:
-            None
-
-    elif current_travel_mode == "near black hole":
-        for i in range(0, len(background_stars_1)):   # draw the moving stars
-            background_stars_1[i].draw(SCREEN)
-        for i in range(0, len(background_stars_2)):   # draw the moving stars
-            background_stars_2[i].draw(SCREEN)
-        for i in range(0, len(background_stars_3)):   # draw the moving stars
-            background_stars_3[i].draw(SCREEN)
-        black_hole.draw(SCREEN)
-        ship.draw(SCREEN)
-
-        r = black_hole.event_horizon - ship.location
-        if r <= 0:
-            running = False
+            now = clock.advance()
+
+        while steps_done < now * SIMULATION_HZ // 1000 and state.running:
+            steps_done = steps_done + 1
+
+            # a key that was just pressed moves the ship once right away, and a key that's held down keeps moving it at moves_per_second
+            inputs = pressed
+            pressed = []
+            move_credit = move_credit + STEP_TIME * moves_per_second / 1000
+            steps = int(move_credit)
+            move_credit = move_credit - steps
+            if len(keys_held) == 1:
+                held = list(keys_held)[0]
+                if held in inputs:
+                    steps = steps - 1
+                inputs = inputs + [held] * max(steps, 0)
+            profiler.lap("keys")
+
+            engine.step(STEP_TIME, inputs)  # let a step's worth of time go by and then move the ship
+            if telemetry is not None:
+                telemetry.record((time.perf_counter() - loop_started) * 1000, steps_done, state, engine.day_length())
+            profiler.lap("simulation")
+            if fleet is not None:
+                fleet.step(STEP_TIME)
+                profiler.lap("fleet")
+            for (star_steps, travel_mode) in engine.star_moves:
+                move_stars(moving_star_layers, star_steps, travel_mode)
+            profiler.lap("star movement")
+
+        if state.travel_mode != "near Earth":
+            while deferred_startup:
+                deferred_startup.pop(0)()
+
+        # move everything on the screen to where the simulation says it is
+        earth.move(state.earth_x - earth.x)
+        black_hole.move(state.black_hole_x - black_hole.x)
+        if ship.facing != state.facing:
+            ship.turn(state.facing)
+        ship.location = state.ship_location
+        current_travel_mode = state.travel_mode
+
+        # make a calendar again only if its date or age has changed
+        if earth_calendar_shown != (state.earth_date, state.earth_age):
+            earth_calendar = create_calendar(state.earth_date, "  Earth's calendar", state.earth_age)
+            earth_calendar_shown = (state.earth_date, state.earth_age)
+        if ship_calendar_shown != (state.ship_date, state.ship_age):
+            ship_calendar = create_calendar(state.ship_date, "Spaceship's calendar", state.ship_age)
+            ship_calendar_shown = (state.ship_date, state.ship_age)
+        if hud is not None and hud_wanted != steps_done:
+            hud.want(hud_keys(engine, state))
+            hud_wanted = steps_done
+        profiler.lap("calendars")
+
+
+    #########################################
+    # draw everything and update the screen #
+    #########################################
+
+        scene = [star_layer_item("stars 0", background_stars_0)]    # the stationary stars
+
+        if current_travel_mode == "near Earth":
+            scene.append(sprites_item("sprites", all_sprites, (earth, ship)))
+        elif current_travel_mode == "interstellar":
+
+            for i in range(0, len(moving_star_layers)):   # the moving stars
+                scene.append(star_layer_item("stars " + str(i + 1), moving_star_layers[i]))
+
+            scene.append(sprites_item("sprites", all_sprites, (ship,)))
+
+        elif current_travel_mode == "near black hole":
+            for i in range(0, len(moving_star_layers)):   # the moving stars
+                scene.append(star_layer_item("stars " + str(i + 1), moving_star_layers[i]))
+            scene.append(sprites_item("sprites", all_sprites, (black_hole, ship)))
+
+        # the distance to the event horizon or to Earth (whichever the ship faces, and nothing once it's in the event horizon)
+        distance = distance_parts(ship.location, ship.facing)
+        if distance is not None:
+            scene.append(distance_item(*distance, hud))
+
+        # the calendars and the mode go on top of everything
+        earth_surface = None
+        ship_surface = None
+        if hud is not None:
+            earth_surface = hud.get(calendar_key(state.earth_date, "  Earth's calendar", state.earth_age, layout.scale))
+            ship_surface = hud.get(calendar_key(state.ship_date, "Spaceship's calendar", state.ship_age, layout.scale))
+        scene.append(calendar_item("earth calendar", earth_calendar, 30, state.mode == "EARTH", earth_surface))
+        scene.append(calendar_item("ship calendar", ship_calendar, WINDOW_WIDTH - 255, state.mode == "THE SPACESHIP", ship_surface))
+        scene.append(mode_item(state.mode, hud))
+        if fleet is not None:
+            if fleet_shown != steps_done:       # only make the heatmap and the text again after the fleet has moved
+                fleet_heatmap = fleet_heatmap_surface(fleet.heatmap(*FLEET_HEATMAP_BINS))
+                fleet_text = fleet_lines(fleet.summary())
+                fleet_shown = steps_done
+                profiler.lap("fleet")
+            scene.append(fleet_item(fleet_heatmap, fleet_text, fleet_shown))
+        if show_profiler:
+            if profiler.frames % 30 == 0 or len(profiler_lines) == 0:
+                profiler_lines = tuple(profiler.overlay_lines() + ["%-16s %6.1f" % ("fps", mainClock.get_fps())])
+            scene.append(profiler_item(profiler_lines))
+
+        if dirty_rects:
+            renderer.render(scene, profiler)    # redraw and update only the parts of the screen that changed
         else:
-            if ship.facing == "RIGHT":
-                draw_distance(r, "KM", "THE EVENT HORIZON") # draw the distance to the event horizon
-            elif ship.facing == "LEFT":
-                draw_distance(1000, "LIGHTYEARS", "EARTH")  # draw the distance to Earth
-            else:
-                None
-
-    draw_calendars()                            # draw the calendars on the screen
-    draw_mode()                                 # draw the mode onto the top of the screen
-
-    pygame.display.flip()   # display the new screen
+            draw_scene(screen, background_color, scene, profiler)
+            pygame.display.flip()               # display the new screen
+            profiler.lap("display")
+        if capture is not None:
+            capture.capture(frame_number + 1, screen)
+            profiler.lap("capture")
+        profiler.end_frame()
+
+        # keep track of the frame times for --report and stop after --frames
+        if first_frame_time is None:
+            first_frame_time = time.time()
+            startup.lap("first frame")
+            if args.startup_profile:
+                for line in startup.lines():
+                    print(line)
+        if args.report is not None:
+            frame_times.append((time.perf_counter() - frame_start) * 1000)
+        frame_number = frame_number + 1
+        if args.frames is not None and frame_number >= args.frames:
+            running = False
 
-pygame.quit()
+        # after the frame is shown, do one piece of the startup that was put off or make the next chunk of stars that's about to scroll on
+        # (this isn't counted in the frame times)
+        if deferred_startup and first_frame_time is not None:
+            deferred_startup.pop(0)()
+        else:
+            for layer in moving_star_layers:
+                if layer.prefetch(WINDOW_WIDTH, layout):
+                    break
+        if checkpoints is not None and time.perf_counter() >= next_checkpoint:
+            checkpoints.save(pack_checkpoint(engine, seed, clock.now, steps_done, move_credit, moving_star_layers))
+            next_checkpoint = time.perf_counter() + args.checkpoint_every
+
+        if state.running == False:  # the ship got stuck in the event horizon
+            running = False
 
-print("You got stuck in the event horizon. Time no longer exists.")
+    if monitor is not None:
+        monitor.stop()
+        monitor.write(args.allocations)
+    if hud is not None:
+        hud.close()
+    if capture is not None:
+        capture.close()     # (this waits for the frames that are still being written)
+    if checkpoints is not None:
+        if state.running:
+            checkpoints.save(pack_checkpoint(engine, seed, clock.now, steps_done, move_credit, moving_star_layers))
+        checkpoints.close()
+        if not state.running and os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)      # the flight is over, so the next one starts from the beginning
+    pygame.quit()
+
+    if profile_path is not None:
+        profiler.dump_csv(profile_path)
+    if recorder is not None:
+        recorder.close(clock.now)
+    if telemetry is not None:
+        telemetry.close()
+    if args.report is not None:
+        write_report(args.report, state, frame_times, startup, first_frame_time, (time.perf_counter() - loop_started) * 1000, hud,
+                     capture.report() if capture is not None else None, monitor.summary() if monitor is not None else None,
+                     telemetry.report() if telemetry is not None else None)
+
+    if telemetry is not None and telemetry.dropped > 0:
+        print("Telemetry dropped %(dropped)d records (%(written)d were written to %(path)s)" % telemetry.report())
+    if capture is not None:
+        print("Exported %(written)d frames to %(directory)s (%(dropped)d dropped) at %(frames_per_second).1f frames per second" % capture.report())
+
+    print("You got stuck in the event horizon. Time no longer exists.")
+
+
+if __name__ == "__main__":
+    main(started=STARTED)
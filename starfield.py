@@ -0,0 +1,289 @@
+#
+# This is the parallax starfield used by the simulator.
+#
+# The stars of a layer are kept in a StarField: one NumPy array each for x, y, radius, color (an index into a palette) and speed.
+# Moving a whole field is one array operation and drawing it writes every star's pixels straight into the surface,
+# so a layer can hold 100k+ stars without a Python object (or a Python loop) per star.
+# The stars are kept sorted by x, so drawing only touches the stars that are on the surface (found with a binary search),
+# however many more there are off to either side.
+#
+# A StarLayer is drawn once onto a tile (a surface at least as wide as the window).
+# The tile repeats to the right of the layer's starting point, so moving a layer only changes its scroll offset
+# and drawing a layer is one or two blits, no matter how many stars are on it.
+#
+# A ChunkedStarLayer never repeats: the sky to the right of its starting point is cut into chunks, and each chunk's stars
+# come from a generator seeded with (seed, layer, chunk), so a chunk can be made whenever it scrolls onto the screen
+# and thrown away when it scrolls off, and it always has the same stars for the same seed.
+#
+# The layers are laid out in the logical coordinates of the simulator's window. Given a Layout (see layout.py), draw()
+# places them on a window of any size, and the tiles and chunks are scaled once per scale by the layout, not every frame.
+#
+
+##########################
+
+import numpy
+import pygame
+
+from collections import OrderedDict
+
+
+# this returns the pixels pygame.draw.circle fills for a circle of the given radius (as x and y offsets from its center)
+_circle_offsets = {}
+
+def circle_offsets(radius):
+    if radius not in _circle_offsets:
+        center = radius + 1
+        stamp = pygame.Surface((2 * center + 1, 2 * center + 1), 0, 32)
+        pygame.draw.circle(stamp, (255, 255, 255), (center, center), radius)
+        (dx, dy) = numpy.nonzero(pygame.surfarray.array2d(stamp))
+        _circle_offsets[radius] = (dx - center, dy - center)
+    return _circle_offsets[radius]
+
+
+class StarField:
+    # every argument but palette is an array with one entry per star (color_index picks the star's color out of palette)
+    def __init__(self, x, y, radius, color_index, speed, palette):
+        self.x = numpy.asarray(x, dtype=numpy.int32)
+        self.y = numpy.asarray(y, dtype=numpy.int32)
+        self.radius = numpy.asarray(radius, dtype=numpy.uint8)
+        self.color_index = numpy.asarray(color_index, dtype=numpy.uint8)
+        self.speed = numpy.asarray(speed, dtype=numpy.int32)
+        self.palette = list(palette)
+        self.radii = [int(r) for r in numpy.unique(self.radius)]
+        self.margin = max(self.radii, default=0) + 1       # a star this far off the surface can still have pixels on it
+        self.same_speed = len(numpy.unique(self.speed)) <= 1   # moving every star by the same amount keeps them in order
+        self.sort()
+
+    # this puts the stars in order of x
+    def sort(self):
+        order = numpy.argsort(self.x, kind="stable")
+        self.x = self.x[order]
+        self.y = self.y[order]
+        self.radius = self.radius[order]
+        self.color_index = self.color_index[order]
+        self.speed = self.speed[order]
+
+    # this returns the slice of the (sorted) stars whose x is from left up to right
+    def between(self, left, right):
+        return slice(int(numpy.searchsorted(self.x, left, "left")), int(numpy.searchsorted(self.x, right, "left")))
+
+    def __len__(self):
+        return len(self.x)
+
+    # this is the number of bytes the star arrays take up
+    def memory(self):
+        return self.x.nbytes + self.y.nbytes + self.radius.nbytes + self.color_index.nbytes + self.speed.nbytes
+
+    # this moves every star to the left by steps times its speed (divided by divisor, the way the far layers slow down)
+    def move(self, steps, divisor=1):
+        self.x -= steps * (self.speed // divisor)
+        if not self.same_speed:
+            self.sort()
+
+    # this draws every star onto the surface, shifted to the right by dx
+    # (with a layout, the stars are in the layout's logical coordinates and drawn where it puts them, at its scale)
+    def draw(self, surface, dx=0, layout=None):
+        (width, height) = surface.get_size()
+        logical_width = width
+        if layout is not None:
+            logical_width = layout.width
+        colors = numpy.array([surface.map_rgb(color) for color in self.palette], dtype=numpy.uint32)
+        on_surface = self.between(-dx - self.margin, logical_width - dx + self.margin)
+        if on_surface.start == on_surface.stop:
+            return
+        pixels = pygame.surfarray.pixels2d(surface)     # this locks the surface until pixels is deleted
+        radius_on_surface = self.radius[on_surface]
+        for radius in self.radii:
+            same_size = radius_on_surface == radius
+            x = self.x[on_surface][same_size] + dx
+            y = self.y[on_surface][same_size]
+            color = colors[self.color_index[on_surface][same_size]]
+            if layout is not None and (layout.scale != 1 or layout.offset != (0, 0)):
+                x = layout.offset[0] + numpy.round(x * layout.scale).astype(numpy.int32)
+                y = layout.offset[1] + numpy.round(y * layout.scale).astype(numpy.int32)
+                radius = layout.length(radius)
+            (offset_x, offset_y) = circle_offsets(radius)
+            for i in range(0, len(offset_x)):           # one array write per pixel of the circle (not per star)
+                px = x + offset_x[i]
+                py = y + offset_y[i]
+                visible = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+                pixels[px[visible], py[visible]] = color[visible].astype(pixels.dtype)
+        del pixels
+
+
+class StarLayer:
+    # field holds the layer's stars (with tile_width, their x must be between 0 and tile_width)
+    # origin is where the layer starts on the screen when it hasn't been scrolled (nothing is drawn to the left of it)
+    # with tile_width=None the layer isn't tiled: the stars are moved and drawn one array operation at a time and run out eventually
+    def __init__(self, field, tile_width, tile_height, origin, speed, background_color):
+        self.field = field
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.origin = origin
+        self.speed = speed              # this is how far the layer scrolls for every step the ship takes (at full speed)
+        self.offset = 0                 # this is how far the layer has been scrolled to the left
+        self.count = len(field)
+        self.background_color = background_color
+        self.tile = None                # the tile is only drawn when it's first needed (or when prepare() is called)
+
+    # this draws the tile if it hasn't been drawn yet (it's done before the first draw() anyway, this lets the simulator do it ahead of time)
+    # (with a layout, the tile is also scaled ahead of time)
+    def prepare(self, layout=None):
+        if self.tile is None and self.tile_width is not None:
+            self.tile = self.render(self.background_color)
+        if layout is not None and self.tile is not None:
+            layout.surface(self.tile)
+
+    # this draws every star onto the tile (the stars are also drawn one tile over on each side so the ones hanging over an edge wrap)
+    def render(self, background_color):
+        tile = pygame.Surface((self.tile_width, self.tile_height), 0, 32)
+        tile.fill(background_color)
+        for dx in (-self.tile_width, 0, self.tile_width):
+            self.field.draw(tile, dx)
+        display = pygame.display.get_surface()
+        if display is not None and (display.get_bitsize() != 32 or display.get_masks() != tile.get_masks()):
+            tile = tile.convert()       # match the display's pixel format so the blits are fast
+        tile.set_colorkey(background_color, pygame.RLEACCEL)   # most of a tile is background, which RLE skips over when blitting
+        return tile
+
+    # (there's nothing to make ahead of time once the tile is drawn, this is here so both kinds of layers can be used the same way)
+    def prefetch(self, screen_width, layout=None):
+        return False
+
+    # this moves the layer to the left by steps times its speed (a negative number of steps moves it to the right)
+    def scroll(self, steps, divisor=1):
+        self.offset = self.offset + steps * (self.speed // divisor)
+        if self.tile_width is None:
+            self.field.move(steps, divisor)
+
+    # this moves the layer straight to offset (like a saved flight, see checkpoint.py)
+    # (an untiled layer's stars all move at the layer's speed, so they move as far as the offset does)
+    def scroll_to(self, offset):
+        if self.tile_width is None:
+            self.field.x -= offset - self.offset
+        self.offset = offset
+
+    def draw(self, screen, layout=None):
+        if self.tile_width is None:
+            self.field.draw(screen, self.origin, layout)
+            return
+        self.prepare()
+
+        tile = self.tile
+        screen_width = screen.get_width()
+        if layout is not None:
+            tile = layout.surface(tile)
+            screen_width = layout.width         # (everything here is in the layout's logical coordinates)
+        start = self.origin - self.offset       # the screen x where the first tile starts
+        if start >= screen_width:
+            return                              # the layer hasn't scrolled onto the screen yet
+        if start < 0:
+            start = start + (-start // self.tile_width) * self.tile_width     # skip the tiles that are completely off the left side
+        x = start
+        while x < screen_width:
+            if layout is not None:
+                screen.blit(tile, layout.point(x, 0))
+            else:
+                screen.blit(tile, (x, 0))
+            x = x + self.tile_width
+
+
+class ChunkedStarLayer:
+    # make_field is called with a NumPy generator and returns the StarField of one chunk (with every x between 0 and chunk_width)
+    # origin is where chunk 0 starts on the screen when the layer hasn't been scrolled (nothing is drawn to the left of it)
+    # max_chunks is the most chunk surfaces kept (the least recently drawn one is thrown away first)
+    def __init__(self, make_field, chunk_width, chunk_height, origin, speed, background_color, seed, layer, max_chunks=4):
+        self.make_field = make_field
+        self.chunk_width = chunk_width
+        self.chunk_height = chunk_height
+        self.origin = origin
+        self.speed = speed              # this is how far the layer scrolls for every step the ship takes (at full speed)
+        self.offset = 0                 # this is how far the layer has been scrolled to the left
+        self.background_color = background_color
+        self.seed = seed
+        self.layer = layer              # the number of the layer (so every layer of the same sky gets different stars)
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()     # chunk index -> rendered surface (least recently drawn first)
+        self.generated = 0              # the number of chunks rendered so far (a chunk that was thrown away and came back counts again)
+
+    # this returns the stars of a chunk (the same ones every time for the same seed, layer and chunk)
+    def field(self, chunk):
+        return self.make_field(numpy.random.default_rng([self.seed, self.layer, chunk]))
+
+    # this draws a chunk's stars onto its own surface (with the stars of the chunks on each side that hang over its edges)
+    def render(self, chunk):
+        surface = pygame.Surface((self.chunk_width, self.chunk_height), 0, 32)
+        surface.fill(self.background_color)
+        for neighbor in (chunk - 1, chunk, chunk + 1):
+            if neighbor >= 0:
+                self.field(neighbor).draw(surface, (neighbor - chunk) * self.chunk_width)
+        display = pygame.display.get_surface()
+        if display is not None and (display.get_bitsize() != 32 or display.get_masks() != surface.get_masks()):
+            surface = surface.convert()
+        surface.set_colorkey(self.background_color, pygame.RLEACCEL)
+        pygame.Surface((1, 1)).blit(surface, (0, 0))    # the first blit run-length encodes the surface, so do it now instead of in the middle of a frame
+        self.generated = self.generated + 1
+        return surface
+
+    # this returns the surface of a chunk, rendering it if it isn't in the cache (and throwing out the least recently drawn one if the cache is full)
+    def chunk(self, chunk):
+        surface = self.chunks.get(chunk)
+        if surface is None:
+            surface = self.render(chunk)
+            self.chunks[chunk] = surface
+            if len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(chunk)
+        return surface
+
+    # this is the range of chunks that are on a screen of the given width right now
+    def visible_chunks(self, screen_width):
+        start = self.origin - self.offset           # the screen x where chunk 0 starts
+        first = max(0, -start // self.chunk_width)
+        last = (screen_width - 1 - start) // self.chunk_width
+        return range(first, last + 1)
+
+    # this renders the first chunk ahead of time (so the simulator can do it before the layer scrolls onto the screen)
+    # (with a layout, the chunk is also scaled ahead of time)
+    def prepare(self, layout=None):
+        surface = self.chunk(max(0, (self.offset - self.origin) // self.chunk_width))
+        if layout is not None:
+            layout.surface(surface)
+
+    # this renders the chunk that's next to come onto the screen (on either side) if it isn't in the cache yet
+    # (the simulator calls it after a frame is shown so a new chunk doesn't have to be made in the middle of one)
+    # it returns True if it rendered a chunk
+    def prefetch(self, screen_width, layout=None):
+        visible = self.visible_chunks(screen_width)
+        if len(visible) == 0:
+            return False
+        for chunk in (visible[-1] + 1, visible[0] - 1):
+            if chunk >= 0 and chunk not in self.chunks:
+                surface = self.chunk(chunk)
+                self.chunks.move_to_end(chunk, last=False)  # it isn't on the screen yet, so it's the first to go if the cache fills up
+                if layout is not None:
+                    layout.surface(surface)
+                return True
+        return False
+
+    # this moves the layer to the left by steps times its speed (a negative number of steps moves it to the right)
+    def scroll(self, steps, divisor=1):
+        self.offset = self.offset + steps * (self.speed // divisor)
+
+    # this moves the layer straight to offset (the chunks are made from the seed wherever they are)
+    def scroll_to(self, offset):
+        self.offset = offset
+
+    def draw(self, screen, layout=None):
+        start = self.origin - self.offset
+        if layout is None:
+            for chunk in self.visible_chunks(screen.get_width()):
+                screen.blit(self.chunk(chunk), (start + chunk * self.chunk_width, 0))
+            return
+        for chunk in self.visible_chunks(layout.width):     # (everything here is in the layout's logical coordinates)
+            screen.blit(layout.surface(self.chunk(chunk)), layout.point(start + chunk * self.chunk_width, 0))
+
+    # this is the number of bytes the cached chunk surfaces take up
+    def memory(self):
+        return sum(surface.get_pitch() * surface.get_height() for surface in self.chunks.values())
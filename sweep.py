@@ -0,0 +1,193 @@
+#
+# This runs the simulation without a window for every combination of a grid of parameters and flight profiles.
+#
+# Each combination (a configuration) flies the engine (see engine.py) through a flight profile with fixed simulation steps,
+# and the final dates and ages, the gap between the two observers and how long the ship took to reach the event horizon
+# are written as one row of a CSV file. The configurations are spread over a pool of processes, and the workers only
+# import the engine (never pygame), so a sweep of thousands of configurations scales with the number of cores.
+#
+# Usage:
+#
+#     python sweep.py --bh 500,1000 --eh 2000,3000 --ship-speed 1,2 --output sweep.csv
+#     python sweep.py --profile dive --profile hover --jobs 8 --output sweep.csv
+#     python sweep.py --model toy,schwarzschild,falling --output sweep.csv
+#
+
+##########################
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+
+from datetime import date
+
+from engine import Engine, SIMULATION_HZ, STEP_TIME, RIGHT, LEFT, TAB
+from dilation import MODEL_NAMES
+
+
+# A flight profile decides the inputs of every step from the engine (like a player holding down the keys would).
+# It's called with the engine, the number of steps so far and a dictionary it can keep notes in during the flight,
+# and returns the list of inputs for the next step, or None once the flight is over.
+
+# this flies straight into the event horizon
+def dive(engine, step, notes):
+    return [RIGHT]
+
+# this switches to the ship's perspective first and then flies straight into the event horizon
+def dive_from_ship(engine, step, notes):
+    if step == 0:
+        return [TAB]
+    return [RIGHT]
+
+# this flies to 100 lightyears from the event horizon, waits there for a minute and flies back to Earth
+def hover(engine, step, notes):
+    state = engine.state
+    if "hover_until" not in notes:
+        if engine.radius() > 100:
+            return [RIGHT]
+        notes["hover_until"] = state.elapsed + 60000
+    if state.elapsed < notes["hover_until"]:
+        return []
+    if state.travel_mode == "near Earth":
+        return None
+    return [LEFT]
+
+PROFILES = {
+    "dive": dive,
+    "dive from ship": dive_from_ship,
+    "hover": hover,
+}
+
+
+# this returns the configurations of a sweep (one dictionary per combination of the grids and profiles)
+def configurations(grids, profiles, start_date, max_seconds):
+    names = list(grids)
+    configs = []
+    for values in itertools.product(*[grids[name] for name in names]):
+        config = dict(zip(names, values))
+        if config["eh_location"] <= config["bh_location"]:
+            continue                    # the event horizon has to be past the black hole
+        for profile in profiles:
+            configs.append(dict(config, profile=profile, start_date=start_date, max_seconds=max_seconds))
+    return configs
+
+
+# this flies one configuration and returns its row of the results (it runs in a worker process)
+# (a configuration that fails gets a row with the error instead of the results, so it doesn't stop the rest of the sweep)
+def run_configuration(config):
+    row = {
+        "bh_location": config["bh_location"],
+        "eh_location": config["eh_location"],
+        "milliseconds_per_day": config["milliseconds_per_day"],
+        "speed": config["speed"],
+        "ship_speed": config["ship_speed"],
+        "model": config["model"],
+        "profile": config["profile"],
+        "error": "",
+    }
+    try:
+        row.update(fly(config))
+    except Exception as error:
+        row["error"] = type(error).__name__ + ": " + str(error)
+    return row
+
+# this flies the configuration through its profile and returns the results
+def fly(config):
+    engine = Engine(config["bh_location"], config["eh_location"], config["milliseconds_per_day"], config["speed"],
+                    config["ship_speed"], start_date=config["start_date"], model=config["model"])
+    state = engine.state
+    profile = PROFILES[config["profile"]]
+    max_steps = int(config["max_seconds"] * SIMULATION_HZ)
+
+    step = 0
+    notes = {}
+    while state.running and step < max_steps:
+        inputs = profile(engine, step, notes)
+        if inputs is None:
+            break
+        engine.step(STEP_TIME, inputs)
+        step = step + 1
+
+    return {
+        "steps": step,
+        "reached_horizon": not state.running,
+        "time_to_horizon_ms": round(state.elapsed) if not state.running else "",
+        "earth_date": state.earth_date.isoformat(),
+        "ship_date": state.ship_date.isoformat(),
+        "earth_age": state.earth_age,
+        "ship_age": state.ship_age,
+        "age_gap": state.earth_age - state.ship_age,
+        "day_gap": state.earth_time.days - state.ship_time.days,
+    }
+
+COLUMNS = ["bh_location", "eh_location", "milliseconds_per_day", "speed", "ship_speed", "model", "profile", "steps", "reached_horizon",
+           "time_to_horizon_ms", "earth_date", "ship_date", "earth_age", "ship_age", "age_gap", "day_gap", "error"]
+
+
+# this turns "500,1000" into [500, 1000]
+def grid(text):
+    return [int(value) for value in text.split(",")]
+
+# this turns "toy,schwarzschild" into ["toy", "schwarzschild"]
+def model_grid(text):
+    models = text.split(",")
+    for model in models:
+        if model not in MODEL_NAMES:
+            raise argparse.ArgumentTypeError("unknown model " + repr(model) + " (choose from " + ", ".join(MODEL_NAMES) + ")")
+    return models
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the simulation for every combination of a grid of parameters and flight profiles.")
+    parser.add_argument("--bh", type=grid, default=[1000], help="black hole locations (comma separated)")
+    parser.add_argument("--eh", type=grid, default=[2000], help="event horizon locations (comma separated)")
+    parser.add_argument("--ms-per-day", type=grid, default=[1000], help="milliseconds per simulated day (comma separated)")
+    parser.add_argument("--speed", type=grid, default=[5], help="how far Earth moves on the screen per step (comma separated)")
+    parser.add_argument("--ship-speed", type=grid, default=[1], help="how far the ship moves per step (comma separated)")
+    parser.add_argument("--model", type=model_grid, default=["toy"], help="gravity models (comma separated, see gravity.py)")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES), help="a flight profile to fly (can be given more than once, all of them by default)")
+    parser.add_argument("--max-seconds", type=float, default=600, help="stop a flight after this many seconds of simulation time")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date.today(), help="the date both calendars start on (YYYY-MM-DD)")
+    parser.add_argument("--jobs", type=int, default=None, help="the number of worker processes (the number of cores by default)")
+    parser.add_argument("--output", help="write the results to this CSV file (instead of the standard output)")
+    args = parser.parse_args()
+
+    grids = {
+        "bh_location": args.bh,
+        "eh_location": args.eh,
+        "milliseconds_per_day": args.ms_per_day,
+        "speed": args.speed,
+        "ship_speed": args.ship_speed,
+        "model": args.model,
+    }
+    configs = configurations(grids, args.profile or list(PROFILES), args.start_date, args.max_seconds)
+
+    started = time.perf_counter()
+    jobs = args.jobs or os.cpu_count() or 1
+    chunksize = max(1, len(configs) // (jobs * 8))     # big enough chunks that handing them out costs little, small enough to even out the workers
+    with multiprocessing.Pool(jobs) as pool:
+        rows = pool.map(run_configuration, configs, chunksize)
+    seconds = time.perf_counter() - started
+
+    if args.output is not None:
+        f = open(args.output, "w", newline="")
+    else:
+        f = sys.stdout
+    writer = csv.DictWriter(f, COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    if f is not sys.stdout:
+        f.close()
+
+    print("%d configurations in %.1f s (%.1f per second)" % (len(rows), seconds, len(rows) / seconds if seconds > 0 else 0), file=sys.stderr)
+    failed = [row for row in rows if row["error"]]
+    if failed:
+        print("%d configurations failed (see the error column)" % len(failed), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#
+# This is the telemetry stream of the simulator: one fixed-width binary record for every simulation step.
+#
+# The main loop only puts a tuple on a bounded queue (and drops it if the queue is full, so writing never holds up a frame).
+# A background thread packs the records and writes them to the file in chunks, and once a file reaches max_bytes it's
+# rotated like a log file (flight.tlm -> flight.tlm.1 -> flight.tlm.2 ...), so the memory and the disk space used stay
+# the same over a session of any length.
+#
+# Usage:
+#
+#     simulator.py --telemetry flight.tlm
+#     python telemetry.py flight.tlm > flight.csv     # turn a telemetry file into CSV
+#
+
+##########################
+
+import os
+import queue
+import struct
+import sys
+import threading
+
+from datetime import date
+
+
+MAGIC = b"TDST"
+VERSION = 1
+HEADER = struct.Struct("<4sBH")             # magic, version, record size
+RECORD = struct.Struct("<dIiBBdIIHH")       # wall ms, step, ship location, travel mode, mode, day length (ms), Earth's date, the ship's date (as ordinals), Earth's age, the ship's age
+
+FIELDS = ["wall_ms", "step", "ship_location", "travel_mode", "mode", "day_length_ms", "earth_date", "ship_date", "earth_age", "ship_age"]
+
+
+class TelemetryWriter:
+    def __init__(self, path, travel_modes, modes, max_bytes=64 * 1024 * 1024, backups=3, queue_size=4096, chunk_records=600):
+        self.path = path
+        self.travel_modes = {name: i for (i, name) in enumerate(travel_modes)}     # the records store indexes into these lists
+        self.modes = {name: i for (i, name) in enumerate(modes)}
+        self.max_bytes = max_bytes          # a file is rotated before it gets bigger than this
+        self.backups = backups              # the number of rotated files kept
+        self.chunk_records = chunk_records  # the records are written in chunks of this many (or every half a second, if that comes first)
+        self.queue = queue.Queue(queue_size)
+        self.dropped = 0                    # the records that didn't fit on the queue
+        self.written = 0
+        self.file = None
+        self.size = 0                       # the bytes in the current file
+        self.thread = threading.Thread(target=self.run, name="telemetry", daemon=True)
+        self.thread.start()
+
+    # this queues one step's record (it's called from the main loop and never waits)
+    def record(self, wall_ms, step, state, day_length):
+        item = (wall_ms, step, state.ship_location, self.travel_modes[state.travel_mode], self.modes[state.mode], day_length,
+                state.earth_date.toordinal(), state.ship_date.toordinal(), state.earth_age, state.ship_age)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped = self.dropped + 1
+
+    # this writes everything that's still queued and stops the background thread
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    # this returns the numbers of the stream (the records dropped are the ones lost because the queue was full)
+    def report(self):
+        return {
+            "path": self.path,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+    ##############################
+    # the background thread      #
+    ##############################
+
+    def run(self):
+        self.open()
+        chunk = bytearray()
+        count = 0
+        while True:
+            try:
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                item = False                # nothing came in for a while, so write what there is
+            if item:
+                chunk += RECORD.pack(*item)
+                count = count + 1
+            if count > 0 and (not item or count >= self.chunk_records):
+                self.write(chunk)
+                self.written = self.written + count
+                chunk = bytearray()
+                count = 0
+            if item is None:
+                break
+        self.file.close()
+
+    def open(self):
+        self.file = open(self.path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.size = HEADER.size
+
+    def write(self, chunk):
+        if self.size + len(chunk) > self.max_bytes:
+            self.rotate()
+        self.file.write(chunk)
+        self.file.flush()
+        self.size = self.size + len(chunk)
+
+    # this moves flight.tlm to flight.tlm.1 (and flight.tlm.1 to flight.tlm.2 and so on) and starts a new flight.tlm
+    def rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(self.path + "." + str(i)):
+                os.replace(self.path + "." + str(i), self.path + "." + str(i + 1))
+        if self.backups > 0:
+            os.replace(self.path, self.path + ".1")
+        self.open()
+
+
+# this returns every record of a telemetry file as a tuple of FIELDS (with the dates turned back into dates)
+def read_telemetry(path, travel_modes, modes):
+    with open(path, "rb") as f:
+        data = f.read()
+    (magic, version, record_size) = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(path + " isn't a version " + str(VERSION) + " telemetry file")
+    end = HEADER.size + (len(data) - HEADER.size) // RECORD.size * RECORD.size     # a record cut off by a crash is left out
+    records = []
+    for record in RECORD.iter_unpack(data[HEADER.size:end]):
+        (wall_ms, step, location, travel_mode, mode, day_length, earth_date, ship_date, earth_age, ship_age) = record
+        records.append((wall_ms, step, location, travel_modes[travel_mode], modes[mode], day_length,
+                        date.fromordinal(earth_date), date.fromordinal(ship_date), earth_age, ship_age))
+    return records
+
+
+if __name__ == "__main__":
+    import csv
+    from engine import TRAVEL_MODES, MODES
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(FIELDS)
+    for path in sys.argv[1:]:
+        writer.writerows(read_telemetry(path, TRAVEL_MODES, MODES))
@@ -0,0 +1,95 @@
+#
+# These check that a checkpoint (see checkpoint.py) brings back exactly the flight it was saved from.
+#
+# A flight is saved with pack_checkpoint(), read back with Checkpoint and restored into a new engine and new star layers,
+# and then both flights carry on side by side: they have to stay the same step for step (so a field that's packed in the
+# wrong order or left out of the STATE struct shows up here).
+#
+# Usage:
+#
+#     python -m pytest -q test_checkpoint.py       # or python -m unittest test_checkpoint
+#
+
+##########################
+
+import os
+import tempfile
+import unittest
+
+from datetime import date
+
+import numpy
+
+from checkpoint import Checkpoint, pack_checkpoint
+from engine import Engine, STEP_TIME, RIGHT, LEFT, TAB
+from starfield import StarField, StarLayer, ChunkedStarLayer
+
+
+# this is every number of the engine's state (the proper times as their days and fractions)
+def numbers(engine):
+    state = engine.state
+    values = dict(vars(state))
+    for name in ("earth_time", "ship_time"):
+        time = values.pop(name)
+        values[name] = (time.start_date, time.start_age, time.days, time.fraction)
+    return values
+
+# this makes an untiled layer and a chunked layer (the chunks are never made, only their offsets matter here)
+def make_layers():
+    count = 50
+    field = StarField(numpy.arange(count) * 20, numpy.zeros(count), numpy.ones(count), numpy.zeros(count), numpy.full(count, 5), [(255, 255, 255)])
+    return [StarLayer(field, None, 700, 1300, 5, (0, 0, 0)), ChunkedStarLayer(None, 1300, 700, 1300, 10, (0, 0, 0), 5, 2)]
+
+# this flies the engine (and scrolls the layers the way the simulator does) through the inputs
+def fly(engine, layers, inputs):
+    for step_inputs in inputs:
+        engine.step(STEP_TIME, step_inputs)
+        for (steps, travel_mode) in engine.star_moves:
+            for (i, layer) in enumerate(layers):
+                layer.scroll(steps, [1, 2][i] if travel_mode == "near black hole" else 1)
+
+
+class CheckpointTest(unittest.TestCase):
+    def test_round_trip(self):
+        for model in ("toy", "falling"):
+            engine = Engine(start_date=date(2026, 3, 1), start_age=33, model=model)
+            layers = make_layers()
+            fly(engine, layers, [[RIGHT]] * 1300 + [[TAB]] + [[RIGHT]] * 40 + [[LEFT]] * 3 + [[]] * 7)
+
+            (handle, path) = tempfile.mkstemp(suffix=".ckpt")
+            try:
+                with os.fdopen(handle, "wb") as f:
+                    f.write(pack_checkpoint(engine, 12345, 23456, 1351, 0.25, layers))
+                checkpoint = Checkpoint(path)
+            finally:
+                os.remove(path)
+            self.assertEqual((checkpoint.seed, checkpoint.now, checkpoint.steps_done, checkpoint.move_credit), (12345, 23456, 1351, 0.25))
+            self.assertEqual(checkpoint.model, model)
+
+            resumed = Engine(start_date=checkpoint.start_date, start_age=checkpoint.start_age, model=checkpoint.model)
+            resumed_layers = make_layers()
+            checkpoint.restore(resumed, resumed_layers)
+            self.assertEqual(numbers(resumed), numbers(engine))
+            self.assertEqual([layer.offset for layer in resumed_layers], [layer.offset for layer in layers])
+            self.assertEqual(resumed_layers[0].field.x.tolist(), layers[0].field.x.tolist())
+
+            # both flights carry on the same way (into the event horizon)
+            rest = [[RIGHT]] * 700
+            fly(engine, layers, rest)
+            fly(resumed, resumed_layers, rest)
+            self.assertEqual(numbers(resumed), numbers(engine))
+            self.assertEqual(resumed_layers[0].field.x.tolist(), layers[0].field.x.tolist())
+
+    def test_not_a_checkpoint(self):
+        (handle, path) = tempfile.mkstemp(suffix=".ckpt")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                f.write(b"TDSL\x02" + bytes(20))
+            with self.assertRaises(ValueError):
+                Checkpoint(path)
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#
+# These check that the engine flies every configuration to the event horizon without failing.
+#
+# Far from the black hole's "mode" (a large D) or with a short day, FASTER_DAY rounds to 0 milliseconds near the event
+# horizon, and the engine has to keep going there instead of dividing by the day length.
+#
+# Usage:
+#
+#     python -m pytest -q test_engine.py       # or python -m unittest test_engine
+#
+
+##########################
+
+import unittest
+
+from datetime import date
+
+from engine import Engine, STEP_TIME, RIGHT, TAB
+from dilation import MODEL_NAMES
+
+
+# this flies the engine to the event horizon (from the ship's perspective if tab) and returns it
+def dive(engine, tab):
+    engine.step(STEP_TIME, [TAB] if tab else [])
+    steps = 0
+    while engine.state.running and steps < 100000:
+        engine.step(STEP_TIME, [RIGHT])
+        steps = steps + 1
+    return engine
+
+
+class DiveTest(unittest.TestCase):
+    # (bh_location, eh_location, milliseconds_per_day)
+    CONFIGURATIONS = [(1000, 2000, 1000), (1000, 6000, 1000), (1000, 2000, 100), (0, 20000, 10)]
+
+    def test_to_the_event_horizon(self):
+        for (bh_location, eh_location, milliseconds_per_day) in self.CONFIGURATIONS:
+            for tab in (False, True):
+                engine = dive(Engine(bh_location, eh_location, milliseconds_per_day, start_date=date(2026, 1, 1)), tab)
+                state = engine.state
+                self.assertFalse(state.running, (bh_location, eh_location, milliseconds_per_day, tab))
+                self.assertGreater(state.earth_date, date(2026, 1, 1))
+                self.assertGreaterEqual(state.earth_date, state.ship_date)
+
+
+
+class PerspectiveTest(unittest.TestCase):
+    # with a physical model, seen from the ship Earth's clock runs 1/factor times faster, as much as the ship's runs slower seen from Earth
+    # (only the toy model jumps on top of that, and the day lengths are whole milliseconds, so they agree to a few percent)
+    def test_perspectives_agree(self):
+        for model in MODEL_NAMES[1:]:
+            engine = Engine(model=model)
+            normal = 1 / engine.milliseconds_per_day
+            for location in (1000, 1500, 1900, 1990, 1998):
+                engine.state.ship_location = location
+                engine.update_travel_mode()
+                engine.state.mode = "EARTH"
+                slowdown = normal / engine.rates()[1]
+                engine.state.mode = "THE SPACESHIP"
+                speedup = engine.rates()[0] / normal
+                factor = engine.tables().factor[engine.radius()]
+                self.assertAlmostEqual(slowdown * factor, 1, delta=0.03, msg=(model, location))
+                self.assertAlmostEqual(speedup * factor, 1, delta=0.03, msg=(model, location))
+
+
+if __name__ == "__main__":
+    unittest.main()
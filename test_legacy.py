@@ -0,0 +1,157 @@
+#
+# These check that the tables and the calendars still say exactly what the original simulator's functions said.
+#
+# The day lengths and Earth's jumps are looked up in DilationTables (see dilation.py) and the calendars are built from
+# cached month grids (see calendars.py) instead of being worked out every frame, and the "toy" gravity model has to keep
+# the original curve. The original functions are copied here as they were, so a change to the tables, the toy model or
+# the calendars that shows the player something different fails here.
+#
+# Usage:
+#
+#     python -m pytest -q test_legacy.py       # or python -m unittest test_legacy
+#
+
+##########################
+
+import calendar
+import math
+import unittest
+
+from datetime import date, timedelta
+
+from calendars import MONTH, create_calendar
+from dilation import MILLISECONDS_PER_DAY, MODEL_NAMES, DilationTables
+
+
+# the configurations the tables are checked for (bh_location, eh_location, milliseconds_per_day), the simulator's first
+CONFIGURATIONS = [(1000, 2000, MILLISECONDS_PER_DAY), (250, 1900, MILLISECONDS_PER_DAY), (1000, 2000, 700), (0, 64, 1000)]
+
+
+##########################################
+# the original functions (as they were)  #
+##########################################
+
+def SLOWER_DAY(R, D, milliseconds_per_day):
+    factor = (math.sqrt(1 - ((D - R)/D)**2)) ** 2
+    contract = round(milliseconds_per_day / factor)
+    return contract
+
+def FASTER_DAY(R, D, milliseconds_per_day):
+    factor = (math.sqrt(1 - ((D - R)/D)**2)) ** 2
+    dilate = round(milliseconds_per_day * factor)
+    return dilate
+
+# (the original ladder was inline in the main loop and left jump_days alone within 1 of the event horizon)
+def JUMP_DAYS(radius, jump_days):
+    if radius > 500:
+        jump_days = 1
+    elif radius > 250:
+        jump_days = 2
+    elif radius > 125:
+        jump_days = 4
+    elif radius > 62:
+        jump_days = 8
+    elif radius > 30:
+        jump_days = 16
+    elif radius > 15:
+        jump_days = 32
+    elif radius > 8:
+        jump_days = 64
+    elif radius > 4:
+        jump_days = 128
+    elif radius > 2:
+        jump_days = 256
+    elif radius > 1:
+        jump_days = 512
+    return jump_days
+
+def legacy_calendar(input_date, name_of_calendar, age):
+
+    current_calendar = calendar.month(input_date.year, input_date.month)  # a calendar of the current month (as single string)
+    today = int(input_date.day)
+    split = current_calendar.split("\n")
+    done = False
+
+    if today < 10:
+        for i in range(2, len(split)):
+            if done == True:
+                break
+            elif done == False:
+                for j in range(0, len(split[i])):
+                    if split[i][j] == str(today):
+                        string = split[i]
+                        split[i] = string[:j] + " " + string[j+1:]
+                        done = True
+                        break
+    elif today >= 10:
+        for i in range(2, len(split)):
+            if done == True:
+                break
+            elif done == False:
+                for j in range(0, len(split[i])):
+                    if split[i][j : j+2] == str(today):
+                        string = split[i]
+                        split[i] = string[:j] + "  " + string[j+2:]
+                        done = True
+                        break
+
+    if split[-1] == "":                                                     # remove the last row if it's blank
+        del split[-1]
+
+    last_row1 = " Today is: " + MONTH[input_date.month] + " " + str(today)
+    split.append(last_row1)                                                 # add today's date to the last row
+    last_row2 = "      Age: " + str(age)
+    split.append(last_row2)                                                 # add the current age of the person to the last row
+    split.insert(0, name_of_calendar)                                       # insert the calendar name at the top of the calendar
+    return split
+
+
+###########
+# tests   #
+###########
+
+class TableTest(unittest.TestCase):
+    def test_day_lengths(self):
+        for (bh_location, eh_location, milliseconds_per_day) in CONFIGURATIONS:
+            tables = DilationTables(bh_location, eh_location, milliseconds_per_day, "toy")
+            D = eh_location - bh_location
+            for R in range(1, D + 1):
+                self.assertEqual(tables.slower(R), SLOWER_DAY(R, D, milliseconds_per_day), (bh_location, eh_location, milliseconds_per_day, R))
+                self.assertEqual(tables.faster(R), FASTER_DAY(R, D, milliseconds_per_day), (bh_location, eh_location, milliseconds_per_day, R))
+
+    def test_jump_days(self):
+        for (bh_location, eh_location, milliseconds_per_day) in CONFIGURATIONS:
+            tables = DilationTables(bh_location, eh_location, milliseconds_per_day, "toy")
+            for radius in range(-2, eh_location - bh_location + 2):
+                for previous in (1, 8, 512):
+                    self.assertEqual(tables.jump(radius, previous), JUMP_DAYS(radius, previous), (radius, previous))
+
+
+class ModelTableTest(unittest.TestCase):
+    # every model has tables for any D, however small (a D of 500 or less leaves out rungs of the ladder)
+    def test_small_distances(self):
+        for model in MODEL_NAMES:
+            for D in (1, 2, 3, 10, 62, 400, 500, 501, 1000):
+                tables = DilationTables(1000, 1000 + D, MILLISECONDS_PER_DAY, model)
+                for R in range(1, D + 1):
+                    self.assertGreaterEqual(tables.slower(R), MILLISECONDS_PER_DAY, (model, D, R))
+                    self.assertLessEqual(tables.faster(R), MILLISECONDS_PER_DAY, (model, D, R))
+                    self.assertIn(tables.jump(R, 7), (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 7), (model, D, R))
+
+
+class CalendarTest(unittest.TestCase):
+    # every day of a few decades (every month starts on every weekday and every February length comes up)
+    def test_every_day(self):
+        day = date(1996, 1, 1)
+        while day < date(2032, 1, 1):
+            for (name, age) in (("  Earth's calendar", 20), ("Spaceship's calendar", 137)):
+                self.assertEqual(list(create_calendar(day, name, age)), legacy_calendar(day, name, age), day)
+            day = day + timedelta(days=1)
+
+    def test_last_dates(self):
+        for day in (date(1, 1, 1), date(9999, 12, 1), date.max):
+            self.assertEqual(list(create_calendar(day, "  Earth's calendar", 20)), legacy_calendar(day, "  Earth's calendar", 20), day)
+
+
+if __name__ == "__main__":
+    unittest.main()
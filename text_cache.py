@@ -0,0 +1,70 @@
+#
+# This is the text cache used by the simulator to draw the calendars and the HUD.
+#
+# Building a font with pygame.font.SysFont scans the system's fonts, so every font is built once and kept.
+# Rendering a line of text is also slow compared to blitting it, and the calendars only change when a day goes by,
+# so the rendered lines are kept in a least-recently-used cache keyed by (text, font, color, antialias).
+#
+# SDL_ttf isn't safe to use from two threads at once, so every font is built and every line is rendered with FONT_LOCK held
+# (the HUD's background thread renders with the same fonts under the same lock, see hud.py).
+#
+
+##########################
+
+import threading
+
+import pygame
+
+from collections import OrderedDict
+
+
+FONT_LOCK = threading.Lock()
+
+
+class TextCache:
+    def __init__(self, max_lines=256):
+        self.fonts = {}                 # (font name, font size) -> pygame font object
+        self.lines = OrderedDict()      # (text, font name, font size, color, antialias) -> rendered surface (oldest first)
+        self.max_lines = max_lines      # this is the most rendered lines kept before the least recently used one is dropped
+        self.hits = 0
+        self.misses = 0
+
+    # this returns the font object for the given font, building it only the first time it's asked for
+    def font(self, name, size):
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            with FONT_LOCK:
+                font = pygame.font.SysFont(name, size)
+            self.fonts[key] = font
+        return font
+
+    # this returns a surface with the text rendered on it (rendering it only if it isn't already cached)
+    def render(self, text, name, size, color, antialias=True):
+        key = (text, name, size, tuple(color), antialias)
+        surface = self.lines.get(key)
+        if surface is not None:
+            self.lines.move_to_end(key)             # mark the line as the most recently used
+            self.hits = self.hits + 1
+            return surface
+
+        self.misses = self.misses + 1
+        font = self.font(name, size)
+        with FONT_LOCK:
+            surface = font.render(text, antialias, color)
+        self.lines[key] = surface
+        if len(self.lines) > self.max_lines:
+            self.lines.popitem(last=False)          # drop the least recently used line
+        return surface
+
+    # this returns the fraction of render() calls that were served from the cache
+    def hit_rate(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def clear(self):
+        self.lines.clear()
+        self.hits = 0
+        self.misses = 0